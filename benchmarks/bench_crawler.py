@@ -0,0 +1,91 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from crawler import crawl
+from languages import source_extensions
+
+GENERATED_HEADER = "// Code generated by protoc-gen-go. DO NOT EDIT.\n\n"
+
+def build_tree(root, snippet_codes, packages, files_per_package):
+    # A repository-like tree: own packages with a few generated files, a large
+    # vendor directory and test fixtures
+    for top, count in [('pkg', packages), ('vendor', packages * 4), ('testdata', packages // 2)]:
+        for package in range(count):
+            directory = os.path.join(root, top, f"p{package}")
+            os.makedirs(directory)
+            for i in range(files_per_package):
+                code = snippet_codes[(package + i) % len(snippet_codes)]
+                if i % 5 == 0:
+                    code = GENERATED_HEADER + code
+                with open(os.path.join(directory, f"f{i}.go"), 'w', encoding='utf-8') as f:
+                    f.write(code)
+            with open(os.path.join(directory, 'README.md'), 'w', encoding='utf-8') as f:
+                f.write("notes\n")
+
+def walk_and_read(root):
+    # The previous behaviour: visit every directory and read every file
+    paths = []
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(directory, filename)
+            with open(path, 'rb') as f:
+                f.read()
+            paths.append(path)
+    return paths
+
+def crawl_and_read(root):
+    paths = []
+    for path in crawl(root, source_extensions()):
+        with open(path, 'rb') as f:
+            f.read()
+        paths.append(path)
+    return paths
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare reading a whole tree with crawling it with vendor and generated-file skipping.")
+    parser.add_argument('--snippets', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snippets'))
+    parser.add_argument('--packages', type=int, default=50)
+    parser.add_argument('--files-per-package', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    snippet_codes = []
+    for path in sorted(glob.glob(os.path.join(args.snippets, '*.go'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            snippet_codes.append(f.read())
+
+    root = tempfile.mkdtemp()
+    try:
+        build_tree(root, snippet_codes, args.packages, args.files_per_package)
+        walk_time, walked = best_time(lambda: walk_and_read(root), args.repeat)
+        crawl_time, crawled = best_time(lambda: crawl_and_read(root), args.repeat)
+        # Own packages without the generated files, every fifth one
+        expected = [path for path in walked if os.sep + 'pkg' + os.sep in path and path.endswith('.go')
+                    and int(os.path.basename(path)[1:-3]) % 5]
+        if crawled != expected:
+            print("Error: the crawler returned different files than expected")
+            sys.exit(1)
+        print(f"{'':>8} {'files':>8} {'time [s]':>10}")
+        print(f"{'walk':>8} {len(walked):>8} {walk_time:>10.4f}")
+        print(f"{'crawl':>8} {len(crawled):>8} {crawl_time:>10.4f}   {walk_time / crawl_time:.1f}x")
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
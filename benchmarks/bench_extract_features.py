@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from extract_features import ALL_COUNTERS, ALL_FEATURES, compute_features, extract_features, scan_code, scan_go_bytes
+
+# Reference copy of the per-line multi-regex extractor that scan_code
+# replaced. Kept here to check that both produce identical features.
+def legacy_extract_features(code):
+    # https://go101.org/article/keywords-and-identifiers.html
+    go_keywords = [
+        'break', 'default', 'func', 'interface', 'select', 'case', 'defer', 'go',
+        'map', 'struct', 'chan', 'else', 'goto', 'package', 'switch', 'const',
+        'fallthrough', 'if', 'range', 'type', 'continue', 'for', 'import',
+        'return', 'var',
+    ]
+
+    # Patterns for numbers, identifiers, comments etc.
+    number_pattern = re.compile(r'\b\d+(\.\d+)?\b')
+    identifier_pattern = re.compile(r'\b[_a-zA-Z][_a-zA-Z0-9\.]*\b')
+    comment_pattern = re.compile(r'//.*|/\*.*?\*/', re.DOTALL)
+    operator_pattern = re.compile(r'(\+\+|--|==|!=|<=|>=|<<|>>|&&|\|\||[\+\-\*/%&\|\^~<>]=?)')
+    whitespace_pattern = re.compile(r'\s+')
+
+    total_line_length = 0
+    max_line_length = 0
+
+    total_identifiers = 0
+    max_identifiers = 0
+
+    total_identifier_length = 0
+    max_identifier_length = 0
+
+    total_indentation = 0
+    max_indentation = 0
+
+    total_keywords = 0
+    max_keywords = 0
+
+    total_numbers = 0
+    max_numbers = 0
+
+    total_comments = 0
+    total_comments_len = 0
+    total_strings = 0
+    total_strings_len = 0
+    total_periods = 0
+    total_commas = 0
+    total_spaces = 0
+    total_parentheses = 0
+    total_arithmetic_ops = 0
+    total_comparison_ops = 0
+    total_assignments = 0
+    total_blank_lines = 0
+
+    total_lines = 0
+
+    in_block_comment = False
+
+    for line in code.splitlines():
+        total_lines += 1
+        stripped_line = line.strip('\n')
+
+        # Check for blank lines
+        if not stripped_line.strip():
+            total_blank_lines += 1
+            continue
+
+        # Handle block comments
+        comment_start = stripped_line.find('//')
+        if comment_start != -1:
+            total_comments += 1
+            total_comments_len = len(line[comment_start+2:].strip())
+            continue
+           
+
+        # Remove strings and character literals to avoid counting operators inside them
+        stripped_line = re.sub(r'"(\\.|[^"\\])*"', '', stripped_line)
+        stripped_line = re.sub(r"'(\\.|[^'\\])*'", '', stripped_line)
+
+        # Line length
+        line_length = len(stripped_line)
+        total_line_length += line_length
+        max_line_length = max(max_line_length, line_length)
+
+        # Indentation
+        indentation = len(line) - len(line.lstrip('\t'))
+        total_indentation += indentation
+        max_indentation = max(max_indentation, indentation)
+
+        # Identifiers
+        identifiers = identifier_pattern.findall(stripped_line)
+        identifiers = [id for id in identifiers if id not in go_keywords and not number_pattern.match(id)]
+        num_identifiers = len(identifiers)
+        total_identifiers += num_identifiers
+        max_identifiers = max(max_identifiers, num_identifiers)
+
+        # Identifier lengths
+        identifier_lengths = [len(id) for id in identifiers]
+        if identifier_lengths:
+            max_id_length_in_line = max(identifier_lengths)
+            max_identifier_length = max(max_identifier_length, max_id_length_in_line)
+            total_identifier_length += sum(identifier_lengths)
+
+        # Keywords
+        keywords_in_line = [word for word in identifiers if word in go_keywords]
+        num_keywords = len([word for word in identifier_pattern.findall(stripped_line) if word in go_keywords])
+        total_keywords += num_keywords
+        max_keywords = max(max_keywords, num_keywords)
+
+        # Numbers
+        numbers_in_line = number_pattern.findall(stripped_line)
+        num_numbers = len(numbers_in_line)
+        total_numbers += num_numbers
+        max_numbers = max(max_numbers, num_numbers)
+
+        # Strings
+        strings = re.findall(r'"(.*?)"', line)
+        if strings:
+            total_strings += len(strings)
+            total_strings_len += sum(len(s) for s in strings)
+
+        # Periods, commas, spaces, parentheses
+        total_periods += stripped_line.count('.')
+        total_commas += stripped_line.count(',')
+        total_spaces += stripped_line.count(' ')
+        total_parentheses += stripped_line.count('(') + stripped_line.count(')') + stripped_line.count('{') + stripped_line.count('}')
+
+    # Compute averages
+    avg_line_length = total_line_length / total_lines if total_lines else 0
+    avg_identifiers = total_identifiers / total_lines if total_lines else 0
+    avg_identifier_length = total_identifier_length / total_identifiers if total_identifiers else 0
+    avg_indentation = total_indentation / total_lines if total_lines else 0
+    avg_keywords = total_keywords / total_lines if total_lines else 0
+    avg_numbers = total_numbers / total_lines if total_lines else 0
+    avg_comments = total_comments / total_lines if total_lines else 0
+    avg_comment_len = total_comments_len / total_comments if total_comments else 0
+    avg_strings = total_strings / total_lines if total_lines else 0
+    avg_strings_len = total_strings_len / total_strings if total_strings else 0
+    avg_periods_and_commas = (total_periods+total_commas) / total_lines if total_lines else 0
+    avg_commas = total_commas / total_lines if total_lines else 0
+    avg_spaces = total_spaces / total_lines if total_lines else 0
+    avg_parentheses = total_parentheses / total_lines if total_lines else 0
+    avg_blank_lines = total_blank_lines / total_lines if total_lines else 0
+
+    # Output only the ones used in the model
+    features = {
+        'avg_strings': avg_strings,
+        'avg_line_length': avg_line_length,
+        'avg_commas_periods': avg_periods_and_commas,
+        'avg_num_identifiers': avg_identifiers,
+        'avg_keywords': avg_keywords,
+        'avg_strings_len': avg_strings_len,
+        'avg_comment_len': avg_comment_len,
+        'avg_identifier_len': avg_identifier_length,
+    }
+
+    return features
+
+def build_large_file(snippet_codes, target_lines):
+    lines = []
+    while len(lines) < target_lines:
+        for code in snippet_codes:
+            lines.extend(code.splitlines())
+    return '\n'.join(lines[:target_lines])
+
+def best_time(function, code, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# src/extract_features.py only takes the vectorized path when every counter
+# is needed, so it is compared with the single-pass scanner on all features
+def extract_all_features(code):
+    return compute_features(scan_code(code, counters=ALL_COUNTERS), ALL_FEATURES)
+
+def extract_all_features_vectorized(data):
+    return compute_features(scan_go_bytes(data, ALL_COUNTERS), ALL_FEATURES)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the single-pass and vectorized extractors with the legacy one.")
+    parser.add_argument('--snippets', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snippets'))
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    snippet_paths = sorted(glob.glob(os.path.join(args.snippets, '*.go')))
+    snippet_codes = []
+    for path in snippet_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            snippet_codes.append(f.read())
+
+    for path, code in zip(snippet_paths, snippet_codes):
+        if (extract_features(code) != legacy_extract_features(code)
+                or extract_all_features_vectorized(code.encode('utf-8')) != extract_all_features(code)):
+            print(f"Error: features differ for {path}")
+            sys.exit(1)
+    print(f"Features identical on {len(snippet_codes)} snippets")
+
+    print(f"{'':>10} {'model features':^38} {'all features':^40}")
+    print(f"{'lines':>10} {'legacy [s]':>12} {'single-pass [s]':>16} {'speedup':>8} "
+          f"{'single-pass [s]':>16} {'vectorized [s]':>15} {'speedup':>8}")
+    for num_lines in args.lines:
+        code = build_large_file(snippet_codes, num_lines)
+        data = code.encode('utf-8')
+        if (extract_features(code) != legacy_extract_features(code)
+                or extract_all_features_vectorized(data) != extract_all_features(code)):
+            print(f"Error: features differ on the {num_lines} line file")
+            sys.exit(1)
+        legacy_time = best_time(legacy_extract_features, code, args.repeat)
+        new_time = best_time(extract_features, code, args.repeat)
+        all_time = best_time(extract_all_features, code, args.repeat)
+        vectorized_time = best_time(extract_all_features_vectorized, data, args.repeat)
+        print(f"{num_lines:>10} {legacy_time:>12.4f} {new_time:>16.4f} {legacy_time / new_time:>7.2f}x "
+              f"{all_time:>16.4f} {vectorized_time:>15.4f} {all_time / vectorized_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
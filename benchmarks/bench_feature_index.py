@@ -0,0 +1,88 @@
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from extract_features import ALL_FEATURES, DEFAULT_FEATURES, extract_features
+from feature_index import FeatureIndex
+
+def build_large_file(snippet_codes, target_lines):
+    lines = []
+    while len(lines) < target_lines:
+        for code in snippet_codes:
+            lines.extend(code.splitlines())
+    return lines[:target_lines]
+
+def random_edit(rng, num_lines, pool):
+    # Replace, insert or delete a few lines, like typing or pasting in an editor
+    start = rng.randint(0, num_lines)
+    end = min(num_lines, start + rng.choice([0, 0, 1, 1, 1, 2, 5]))
+    new_lines = [rng.choice(pool) for _ in range(rng.choice([0, 1, 1, 1, 2, 5]))]
+    if rng.random() < 0.3 and new_lines:
+        # Partial lines, e.g. half-typed strings and comments
+        line = new_lines[0]
+        new_lines[0] = line[:rng.randint(0, len(line))]
+    return start, end, new_lines
+
+def check_random_edits(snippet_codes, num_sequences, num_edits, seed):
+    rng = random.Random(seed)
+    pool = [line for code in snippet_codes for line in code.splitlines()]
+    for sequence in range(num_sequences):
+        feature_names = rng.choice([DEFAULT_FEATURES, ALL_FEATURES])
+        code = rng.choice(snippet_codes)
+        index = FeatureIndex(code, feature_names=feature_names)
+        lines = code.splitlines()
+        for _ in range(num_edits):
+            start, end, new_lines = random_edit(rng, len(lines), pool)
+            index.apply_edit(start, end, new_lines)
+            lines[start:end] = new_lines
+            # One newline per line, so a trailing blank line is kept
+            code = ''.join(line + '\n' for line in lines)
+            if index.features() != extract_features(code, feature_names=feature_names):
+                print(f"Error: features differ after an edit in sequence {sequence}")
+                sys.exit(1)
+    print(f"Features identical to full re-extraction after {num_sequences} sequences of {num_edits} random edits")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the incremental feature index against full re-extraction and compare their speed.")
+    parser.add_argument('--snippets', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snippets'))
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--sequences', type=int, default=200)
+    parser.add_argument('--edits', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    snippet_codes = []
+    for path in sorted(glob.glob(os.path.join(args.snippets, '*.go'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            snippet_codes.append(f.read())
+    check_random_edits(snippet_codes, args.sequences, args.edits, args.seed)
+
+    rng = random.Random(args.seed)
+    pool = [line for code in snippet_codes for line in code.splitlines()]
+    print(f"{'lines':>10} {'full [ms/edit]':>15} {'incremental [ms/edit]':>22} {'speedup':>8}")
+    for num_lines in args.lines:
+        lines = build_large_file(snippet_codes, num_lines)
+        index = FeatureIndex('\n'.join(lines))
+        edits = [random_edit(rng, num_lines, pool) for _ in range(20)]
+
+        start = time.perf_counter()
+        for edit_start, edit_end, new_lines in edits:
+            lines[edit_start:edit_end] = new_lines
+            extract_features('\n'.join(lines))
+        full_time = (time.perf_counter() - start) / len(edits)
+
+        start = time.perf_counter()
+        for edit_start, edit_end, new_lines in edits:
+            index.apply_edit(edit_start, edit_end, new_lines)
+            index.features()
+        incremental_time = (time.perf_counter() - start) / len(edits)
+        print(f"{num_lines:>10} {full_time * 1000:>15.3f} {incremental_time * 1000:>22.3f} "
+              f"{full_time / incremental_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
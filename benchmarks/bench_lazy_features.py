@@ -0,0 +1,63 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from extract_features import ALL_FEATURES, DEFAULT_FEATURES, compute_features, extract_features, scan_code
+
+# Feature sets a scoring run may need: every column extract_features.py can
+# write, the built-in model, and a small retrained model
+FEATURE_SETS = [
+    ('all features', ALL_FEATURES),
+    ('built-in model', DEFAULT_FEATURES),
+    ('2-feature model', ('avg_line_length', 'avg_comment_len')),
+]
+
+def build_large_file(snippet_codes, target_lines):
+    lines = []
+    while len(lines) < target_lines:
+        for code in snippet_codes:
+            lines.extend(code.splitlines())
+    return '\n'.join(lines[:target_lines])
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare extracting only the features a model uses with extracting every feature.")
+    parser.add_argument('--snippets', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snippets'))
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    snippet_codes = []
+    for path in sorted(glob.glob(os.path.join(args.snippets, '*.go'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            snippet_codes.append(f.read())
+
+    print(f"{'lines':>10} " + ' '.join(f"{name + ' [s]':>20} {'speedup':>8}" for name, _ in FEATURE_SETS))
+    for num_lines in args.lines:
+        code = build_large_file(snippet_codes, num_lines)
+        full = compute_features(scan_code(code), ALL_FEATURES)
+        columns = []
+        full_time = None
+        for name, feature_names in FEATURE_SETS:
+            features = extract_features(code, feature_names=feature_names)
+            if features != {feature: full[feature] for feature in feature_names}:
+                print(f"Error: {name} features differ on the {num_lines} line file")
+                sys.exit(1)
+            seconds = best_time(lambda: extract_features(code, feature_names=feature_names), args.repeat)
+            full_time = full_time or seconds
+            columns.append(f"{seconds:>20.4f} {full_time / seconds:>7.2f}x")
+        print(f"{num_lines:>10} " + ' '.join(columns))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from train_model import FEATURE_COLUMNS, join_snippet_features
+
+# Reference copy of the per-snippet lookup that join_snippet_features replaced.
+# Every snippet filters the whole table twice, so it is quadratic in the rows.
+def legacy_join_snippet_features(snippet_filenames, df):
+    data = []
+    for snippet_filename in snippet_filenames:
+        row = df[df['snippet_filename'] == snippet_filename]
+        if row.empty:
+            continue
+        features = {name: row[name].values[0] for name in FEATURE_COLUMNS}
+        label_row = df[df['snippet_filename'] == snippet_filename]
+        data.append({'snippet_filename': snippet_filename, **features,
+                     'readability_rating': label_row['readability_rating'].values[0]})
+    return pd.DataFrame(data)
+
+def build_feature_table(num_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.random((num_rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df.insert(0, 'snippet_filename', [f"{i}.go" for i in range(num_rows)])
+    df['readability_rating'] = rng.uniform(1, 10, num_rows)
+    # Snippets are listed in a different order than the features table
+    snippet_filenames = list(df['snippet_filename'].sample(frac=1, random_state=seed))
+    return snippet_filenames, df
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the indexed join with the per-snippet lookup.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10000,
+                        help="Skip the quadratic legacy lookup above this many rows (default: 10000)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy [s]':>12} {'merge [s]':>10} {'speedup':>8}")
+    for num_rows in args.rows:
+        snippet_filenames, df = build_feature_table(num_rows)
+
+        start = time.perf_counter()
+        joined = join_snippet_features(snippet_filenames, df)
+        merge_time = time.perf_counter() - start
+
+        if num_rows > args.legacy_max_rows:
+            print(f"{num_rows:>10} {'skipped':>12} {merge_time:>10.4f} {'-':>8}")
+            continue
+
+        start = time.perf_counter()
+        legacy = legacy_join_snippet_features(snippet_filenames, df)
+        legacy_time = time.perf_counter() - start
+        if not legacy.equals(joined):
+            print(f"Error: joined tables differ for {num_rows} rows")
+            sys.exit(1)
+        print(f"{num_rows:>10} {legacy_time:>12.4f} {merge_time:>10.4f} {legacy_time / merge_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
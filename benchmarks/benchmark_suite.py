@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+SNIPPETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snippets')
+sys.path.insert(0, SRC_DIR)
+from extract_features import extract_features
+from rate_snippet import DEFAULT_MODEL, calculate_readability_score, normalize_feature_matrix, sigmoid
+from train_model import cross_validate, make_cross_validator
+
+STAGES = ['read', 'extract', 'normalize', 'score', 'train']
+DEFAULT_THRESHOLD = 0.10
+# Stages faster than this are dominated by timer noise and never flagged
+MIN_COMPARED_SECONDS = 0.001
+
+IDENTIFIERS = ['ctx', 'err', 'req', 'resp', 'client', 'config', 'metricSpec', 'replicaCount',
+               'statusReplicas', 'selector', 'handler', 'buf', 'i', 'n', 'result', 'opts']
+CALLS = ['fmt.Sprintf', 'strings.Join', 'a.computeReplicas', 'c.client.Get', 'json.Marshal',
+         'errors.New', 'strconv.Itoa', 'time.Since']
+COMMENTS = ['TODO: handle the retry case', 'Compute the number of replicas for this metric',
+            'nolint', 'See the design document for details']
+STRINGS = ['invalid metric', 'failed to get %s: %v', 'ok', 'replica count out of range']
+
+def generate_go_file(rng, num_lines, comment_density, string_density):
+    lines = [f"func {rng.choice(IDENTIFIERS).capitalize()}{rng.randint(0, 999)}(ctx context.Context) error {{"]
+    depth = 1
+    while len(lines) < num_lines - depth:
+        indent = '\t' * depth
+        roll = rng.random()
+        if roll < comment_density:
+            lines.append(f"{indent}// {rng.choice(COMMENTS)}")
+        elif roll < comment_density + 0.05:
+            lines.append('')
+        elif roll < comment_density + 0.15 and depth < 5:
+            lines.append(f"{indent}if {rng.choice(IDENTIFIERS)} != nil {{")
+            depth += 1
+        elif roll < comment_density + 0.25 and depth > 1:
+            depth -= 1
+            lines.append('\t' * depth + '}')
+        else:
+            args = [rng.choice(IDENTIFIERS) for _ in range(rng.randint(0, 3))]
+            if rng.random() < string_density:
+                args.insert(0, f'"{rng.choice(STRINGS)}"')
+            lines.append(f"{indent}{rng.choice(IDENTIFIERS)}, err := {rng.choice(CALLS)}({', '.join(args)})")
+    while depth > 0:
+        depth -= 1
+        lines.append('\t' * depth + '}')
+    return '\n'.join(lines) + '\n'
+
+def generate_corpus(directory, num_files, num_lines, comment_density=0.1, string_density=0.3, seed=0):
+    # The same parameters always produce byte-identical files
+    rng = random.Random(seed)
+    paths = []
+    for i in range(num_files):
+        path = os.path.join(directory, f"{i:06d}.go")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(generate_go_file(rng, num_lines, comment_density, string_density))
+        paths.append(path)
+    return paths
+
+def corpus_paths(directory):
+    return [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))
+            if filename.endswith('.go')]
+
+def run_stages(paths, cv_folds):
+    state = {}
+
+    def read():
+        codes = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                codes.append(f.read().decode('utf-8'))
+        state['codes'] = codes
+
+    def extract():
+        state['features'] = [extract_features(code) for code in state['codes']]
+
+    def normalize():
+        feature_matrix = np.array([[features[name] for name in DEFAULT_MODEL.feature_names]
+                                   for features in state['features']], dtype=float)
+        state['feature_matrix'] = feature_matrix
+        state['normalized'] = normalize_feature_matrix(feature_matrix)
+
+    def score():
+        state['scores'] = sigmoid(calculate_readability_score(state['normalized']))
+
+    def train():
+        # Labels from the pre-trained model, split at the median like train_model.py
+        y = (state['scores'] > np.median(state['scores'])).astype(int)
+        folds = min(cv_folds, int(np.bincount(y, minlength=2).min()))
+        if folds < 2:
+            return
+        cross_validate(state['feature_matrix'], y, make_cross_validator('stratified', folds, 1, 0))
+
+    return [('read', read), ('extract', extract), ('normalize', normalize), ('score', score), ('train', train)]
+
+def measure_corpus(paths, repeat, cv_folds):
+    num_bytes = sum(os.path.getsize(path) for path in paths)
+    num_lines = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            num_lines += f.read().count(b'\n')
+
+    results = {}
+    # Timings: best of several runs, without tracing overhead
+    for _ in range(repeat):
+        for name, stage in run_stages(paths, cv_folds):
+            start = time.perf_counter()
+            stage()
+            elapsed = time.perf_counter() - start
+            if name not in results or elapsed < results[name]['seconds']:
+                results[name] = {'seconds': elapsed}
+    # Peak memory: one separate traced run, since tracemalloc slows everything down
+    for name, stage in run_stages(paths, cv_folds):
+        tracemalloc.start()
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name]['peak_memory_mb'] = round(peak / 1e6, 3)
+
+    for stats in results.values():
+        seconds = stats['seconds']
+        stats['files_per_sec'] = round(len(paths) / seconds, 1) if seconds else None
+        stats['lines_per_sec'] = round(num_lines / seconds, 1) if seconds else None
+        stats['mb_per_sec'] = round(num_bytes / 1e6 / seconds, 3) if seconds else None
+        stats['seconds'] = round(seconds, 6)
+    return {'files': len(paths), 'lines': num_lines, 'bytes': num_bytes, 'stages': results}
+
+def run(args):
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'corpora': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(directory, args.files, args.lines, args.comment_density, args.string_density, args.seed)
+        name = (f"synthetic-{args.files}x{args.lines}-c{args.comment_density}"
+                f"-s{args.string_density}-seed{args.seed}")
+        report['corpora'][name] = measure_corpus(paths, args.repeat, args.cv_folds)
+    report['corpora']['snippets'] = measure_corpus(corpus_paths(SNIPPETS_DIR), args.repeat, args.cv_folds)
+
+    for corpus, result in report['corpora'].items():
+        print(f"{corpus}: {result['files']} files, {result['lines']} lines")
+        for stage in STAGES:
+            stats = result['stages'][stage]
+            print(f"  {stage:>10} {stats['seconds'] * 1000:>10.2f} ms {stats['lines_per_sec'] or 0:>14.0f} lines/s "
+                  f"{stats['peak_memory_mb']:>10.2f} MB peak")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+def compare(args):
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    regressions = []
+    for corpus, result in current['corpora'].items():
+        if corpus not in baseline['corpora']:
+            print(f"{corpus}: not in baseline, skipped")
+            continue
+        for stage in STAGES:
+            before = baseline['corpora'][corpus]['stages'][stage]
+            after = result['stages'][stage]
+            for metric in ['seconds', 'peak_memory_mb']:
+                if not before[metric]:
+                    continue
+                change = after[metric] / before[metric] - 1
+                noisy = metric == 'seconds' and max(before[metric], after[metric]) < MIN_COMPARED_SECONDS
+                flag = 'REGRESSION' if change > args.threshold and not noisy else ''
+                print(f"{corpus:>40} {stage:>10} {metric:>15} {before[metric]:>12.6f} -> {after[metric]:>12.6f} "
+                      f"{change:>+8.1%} {flag}")
+                if flag:
+                    regressions.append((corpus, stage, metric))
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions above {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions above {args.threshold:.0%}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction, scoring and training.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and optionally save the results")
+    run_parser.add_argument('--files', type=int, default=200, help="Synthetic corpus size in files (default: 200)")
+    run_parser.add_argument('--lines', type=int, default=200, help="Lines per synthetic file (default: 200)")
+    run_parser.add_argument('--comment-density', type=float, default=0.1,
+                            help="Fraction of comment lines (default: 0.1)")
+    run_parser.add_argument('--string-density', type=float, default=0.3,
+                            help="Fraction of statements with a string literal (default: 0.3)")
+    run_parser.add_argument('--seed', type=int, default=0, help="Corpus generator seed (default: 0)")
+    run_parser.add_argument('--repeat', type=int, default=3, help="Timing runs per stage, best is kept (default: 3)")
+    run_parser.add_argument('--cv-folds', type=int, default=5, help="Folds for the training stage (default: 5)")
+    run_parser.add_argument('--output', metavar='PATH', help="Write the results as JSON")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two result files and flag regressions")
+    compare_parser.add_argument('baseline', help="Baseline results JSON")
+    compare_parser.add_argument('current', help="Current results JSON")
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help=f"Relative slowdown or memory growth flagged as regression (default: {DEFAULT_THRESHOLD})")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+if __name__ == "__main__":
+    main()
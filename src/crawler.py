@@ -0,0 +1,84 @@
+import os
+import re
+import sys
+from collections import Counter
+
+# Third-party code, test fixtures and tool state, pruned without being listed
+EXCLUDED_DIRECTORIES = frozenset(['vendor', 'testdata', 'third_party', 'node_modules',
+                                  '.git', '.hg', '.svn', '__pycache__'])
+# Generated-code markers are expected near the top of a file, only this much is read
+GENERATED_HEADER_BYTES = 4096
+# Go's convention (https://go.dev/s/generatedcode) and the @generated tag used by other generators
+GENERATED_PATTERN = re.compile(rb'^// Code generated .* DO NOT EDIT\.\r?$|@generated\b', re.MULTILINE)
+
+def is_generated(path, header_bytes=GENERATED_HEADER_BYTES):
+    with open(path, 'rb') as f:
+        return GENERATED_PATTERN.search(f.read(header_bytes)) is not None
+
+def crawl(root, extensions=None, exclude_dirs=EXCLUDED_DIRECTORIES, max_size=None, include_generated=False,
+          skipped=None):
+    """Yield the files under root lazily, in the order of os.walk with sorted names.
+
+    Directories named in exclude_dirs are not entered. Files are kept if their
+    extension is in extensions (all files if None), they are at most max_size
+    bytes and, unless include_generated is set, they have no generated-code
+    header. Pruned directories and skipped files are counted in the skipped
+    Counter.
+    """
+    if skipped is None:
+        skipped = Counter()
+    try:
+        with os.scandir(root) as scanner:
+            entries = sorted(scanner, key=lambda entry: entry.name)
+    except OSError:
+        skipped['unreadable_directories'] += 1
+        return
+    subdirectories = []
+    for entry in entries:
+        # Symlinked directories are not followed, like os.walk
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name in exclude_dirs:
+                skipped['excluded_directories'] += 1
+            else:
+                subdirectories.append(entry.path)
+            continue
+        if not entry.is_file():
+            continue
+        if extensions is not None and not entry.name.lower().endswith(extensions):
+            continue
+        try:
+            if max_size is not None and entry.stat().st_size > max_size:
+                skipped['large_files'] += 1
+                continue
+            if not include_generated and is_generated(entry.path):
+                skipped['generated_files'] += 1
+                continue
+        except OSError:
+            # Left to the extraction, which reports unreadable files
+            pass
+        yield entry.path
+    for subdirectory in subdirectories:
+        yield from crawl(subdirectory, extensions, exclude_dirs, max_size, include_generated, skipped)
+
+def add_crawl_arguments(parser):
+    parser.add_argument('--exclude-dir', action='append', default=[], metavar='NAME',
+                        help="Also skip directories named NAME, in addition to "
+                             f"{', '.join(sorted(EXCLUDED_DIRECTORIES))} (can be repeated)")
+    parser.add_argument('--max-file-size', type=int, metavar='BYTES',
+                        help="Skip files larger than BYTES (default: no limit)")
+    parser.add_argument('--include-generated', action='store_true',
+                        help="Keep files with a generated-code header such as \"// Code generated ... DO NOT EDIT.\"")
+
+def crawl_options(args, skipped=None):
+    # Keyword arguments of crawl() for the command line options
+    return {
+        'exclude_dirs': EXCLUDED_DIRECTORIES | set(args.exclude_dir),
+        'max_size': args.max_file_size,
+        'include_generated': args.include_generated,
+        'skipped': skipped,
+    }
+
+def report_skipped(skipped, file=sys.stderr):
+    if any(skipped.values()):
+        print("Skipped " + ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in sorted(skipped.items())),
+              file=file)
@@ -1,162 +1,482 @@
 import os
 import sys
 import csv
-import re
-
-def extract_features(code):
-	# https://go101.org/article/keywords-and-identifiers.html
-    go_keywords = [
-        'break', 'default', 'func', 'interface', 'select', 'case', 'defer', 'go',
-        'map', 'struct', 'chan', 'else', 'goto', 'package', 'switch', 'const',
-        'fallthrough', 'if', 'range', 'type', 'continue', 'for', 'import',
-        'return', 'var',
-    ]
-
-    # Patterns for numbers, identifiers, comments etc.
-    number_pattern = re.compile(r'\b\d+(\.\d+)?\b')
-    identifier_pattern = re.compile(r'\b[_a-zA-Z][_a-zA-Z0-9\.]*\b')
-    comment_pattern = re.compile(r'//.*|/\*.*?\*/', re.DOTALL)
-    operator_pattern = re.compile(r'(\+\+|--|==|!=|<=|>=|<<|>>|&&|\|\||[\+\-\*/%&\|\^~<>]=?)')
-    whitespace_pattern = re.compile(r'\s+')
+import codecs
+import contextlib
+import time
+import argparse
+import numpy as np
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from feature_cache import DEFAULT_MAX_ENTRIES, FeatureCache, content_hash, content_hasher, file_content_hash
+from feature_writers import open_feature_writer
+from crawler import add_crawl_arguments, crawl, crawl_options, report_skipped
+from languages import DEFAULT_LANGUAGE, language_for_path, lexer_tables, source_extensions
+from sharding import add_shard_argument, in_shard
+import instrumentation
+
+# Bump whenever the feature definitions change, this invalidates feature caches
+EXTRACTOR_VERSION = 1
+
+# Files larger than this are read in chunks instead of being loaded whole
+STREAMING_THRESHOLD = 16 << 20
+STREAMING_CHUNK_SIZE = 1 << 20
+# Paths taken from the input at a time, bounds memory when files are crawled lazily
+EXTRACTION_BATCH_SIZE = 1000
+# Below this size the NumPy setup costs more than the vectorized counting saves.
+# Only used when every counter is needed, for fewer counters scan_lines wins.
+VECTORIZE_THRESHOLD = 32 << 10
+
+# What a feature is computed from: the scanner counters it reads and a
+# function of those counters
+FeatureDefinition = namedtuple('FeatureDefinition', ['counters', 'compute'])
+
+def counter_feature(name):
+    return FeatureDefinition((name,), lambda counters: counters[name])
+
+def ratio_feature(numerators, denominator):
+    def compute(counters):
+        total = counters[denominator]
+        return sum(counters[name] for name in numerators) / total if total else 0
+    return FeatureDefinition((*numerators, denominator), compute)
+
+# Every column extract_features.py can write, keyed by feature name
+FEATURE_DEFINITIONS = {
+    'total_lines': counter_feature('total_lines'),
+    'avg_line_length': ratio_feature(['total_line_length'], 'total_lines'),
+    'max_line_length': counter_feature('max_line_length'),
+    'avg_num_identifiers': ratio_feature(['total_identifiers'], 'total_lines'),
+    'max_num_identifiers': counter_feature('max_identifiers'),
+    'avg_identifier_len': ratio_feature(['total_identifier_length'], 'total_identifiers'),
+    'max_identifier_len': counter_feature('max_identifier_length'),
+    'avg_indentation': ratio_feature(['total_indentation'], 'total_lines'),
+    'max_indentation': counter_feature('max_indentation'),
+    'avg_keywords': ratio_feature(['total_keywords'], 'total_lines'),
+    'avg_numbers': ratio_feature(['total_numbers'], 'total_lines'),
+    'avg_comments': ratio_feature(['total_comments'], 'total_lines'),
+    # The model was trained on the length of the last comment, not the sum
+    'avg_comment_len': ratio_feature(['last_comment_len'], 'total_comments'),
+    'avg_strings': ratio_feature(['total_strings'], 'total_lines'),
+    'avg_strings_len': ratio_feature(['total_strings_len'], 'total_strings'),
+    'avg_commas_periods': ratio_feature(['total_periods', 'total_commas'], 'total_lines'),
+    'avg_spaces': ratio_feature(['total_spaces'], 'total_lines'),
+    'avg_parenthesis': ratio_feature(['total_parentheses'], 'total_lines'),
+    'avg_blank_lines': ratio_feature(['total_blank_lines'], 'total_lines'),
+}
+
+# Features written by default, the ones used in the model
+DEFAULT_FEATURES = (
+    'avg_strings', 'avg_line_length', 'avg_commas_periods', 'avg_num_identifiers',
+    'avg_keywords', 'avg_strings_len', 'avg_comment_len', 'avg_identifier_len',
+)
+ALL_FEATURES = tuple(FEATURE_DEFINITIONS)
+
+def required_counters(feature_names):
+    counters = set()
+    for name in feature_names:
+        if name not in FEATURE_DEFINITIONS:
+            raise ValueError(f"Unknown feature: {name}")
+        counters.update(FEATURE_DEFINITIONS[name].counters)
+    return frozenset(counters)
+
+ALL_COUNTERS = required_counters(ALL_FEATURES)
+TOKEN_COUNTERS = frozenset(['total_identifiers', 'max_identifiers', 'total_identifier_length',
+                            'max_identifier_length', 'total_keywords'])
+NUMBER_COUNTERS = frozenset(['total_numbers'])
+STRING_COUNTERS = frozenset(['total_strings', 'total_strings_len'])
+INDENTATION_COUNTERS = frozenset(['total_indentation', 'max_indentation'])
+LINE_LENGTH_COUNTERS = frozenset(['total_line_length', 'max_line_length'])
+
+class TokenCounter:
+    """Identifier, keyword and number counters of lines with literals removed.
+
+    Shared by scan_lines() and scan_go_bytes(), which differ only in how they
+    find the code lines and strip their literals.
+    """
+
+    def __init__(self, tables, count_tokens=True, count_numbers=True):
+        self.keywords = tables.keywords
+        self.identifier_pattern = tables.identifier if count_tokens else None
+        self.number_pattern = tables.number if count_numbers else None
+        self.total_identifiers = 0
+        self.max_identifiers = 0
+        self.total_identifier_length = 0
+        self.max_identifier_length = 0
+        self.total_keywords = 0
+        self.max_keywords = 0
+        self.total_numbers = 0
+        self.max_numbers = 0
+
+    def add(self, code_line):
+        # Identifiers and keywords share one tokenization of the line
+        if self.identifier_pattern is not None:
+            words = self.identifier_pattern.findall(code_line)
+            keywords = self.keywords
+            num_keywords = 0
+            total_identifier_length = 0
+            max_identifier_length = self.max_identifier_length
+            for word in words:
+                if word in keywords:
+                    num_keywords += 1
+                else:
+                    identifier_length = len(word)
+                    total_identifier_length += identifier_length
+                    if identifier_length > max_identifier_length:
+                        max_identifier_length = identifier_length
+            self.total_identifier_length += total_identifier_length
+            self.max_identifier_length = max_identifier_length
+            num_identifiers = len(words) - num_keywords
+            self.total_identifiers += num_identifiers
+            if num_identifiers > self.max_identifiers:
+                self.max_identifiers = num_identifiers
+            self.total_keywords += num_keywords
+            if num_keywords > self.max_keywords:
+                self.max_keywords = num_keywords
+
+        if self.number_pattern is not None:
+            num_numbers = len(self.number_pattern.findall(code_line))
+            self.total_numbers += num_numbers
+            if num_numbers > self.max_numbers:
+                self.max_numbers = num_numbers
+
+    def counters(self):
+        return {name: getattr(self, name) for name in TOKEN_COUNTER_NAMES}
+
+# Counters collected by TokenCounter, in the order the scanners return them
+TOKEN_COUNTER_NAMES = ('total_identifiers', 'max_identifiers', 'total_identifier_length', 'max_identifier_length',
+                       'total_keywords', 'max_keywords', 'total_numbers', 'max_numbers')
+
+def scan_code(code, language=DEFAULT_LANGUAGE, counters=ALL_COUNTERS):
+    return scan_lines(code.splitlines(), language, counters)
+
+def scan_lines(lines, language=DEFAULT_LANGUAGE, counters=ALL_COUNTERS):
+    # Collect the per-file counters in a single pass over the lines. Only the
+    # work needed for the requested counters is done, the others stay zero.
+    tables = lexer_tables(language)
+    comment_marker = tables.line_comment
+    literals = tables.literals
+    string_pattern = tables.string
+    string_quotes = tables.string_quotes
+    indent_width = tables.indent_width
+
+    count_line_length = not LINE_LENGTH_COUNTERS.isdisjoint(counters)
+    count_indentation = not INDENTATION_COUNTERS.isdisjoint(counters)
+    count_tokens = not TOKEN_COUNTERS.isdisjoint(counters)
+    count_numbers = not NUMBER_COUNTERS.isdisjoint(counters)
+    count_strings = not STRING_COUNTERS.isdisjoint(counters)
+    count_periods = 'total_periods' in counters
+    count_commas = 'total_commas' in counters
+    count_spaces = 'total_spaces' in counters
+    count_parentheses = 'total_parentheses' in counters
+    strip_literals = (count_line_length or count_tokens or count_numbers
+                      or count_periods or count_commas or count_spaces or count_parentheses)
 
     total_line_length = 0
     max_line_length = 0
 
-    total_identifiers = 0
-    max_identifiers = 0
-
-    total_identifier_length = 0
-    max_identifier_length = 0
+    tokens = TokenCounter(tables, count_tokens, count_numbers)
 
     total_indentation = 0
     max_indentation = 0
 
-    total_keywords = 0
-    max_keywords = 0
-
-    total_numbers = 0
-    max_numbers = 0
-
     total_comments = 0
-    total_comments_len = 0
+    last_comment_len = 0
     total_strings = 0
     total_strings_len = 0
     total_periods = 0
     total_commas = 0
     total_spaces = 0
     total_parentheses = 0
-    total_arithmetic_ops = 0
-    total_comparison_ops = 0
-    total_assignments = 0
     total_blank_lines = 0
 
     total_lines = 0
 
-    in_block_comment = False
-
-    for line in code.splitlines():
+    for line in lines:
         total_lines += 1
-        stripped_line = line.strip('\n')
 
         # Check for blank lines
-        if not stripped_line.strip():
+        if not line or line.isspace():
             total_blank_lines += 1
             continue
 
-        # Handle block comments
-        comment_start = stripped_line.find('//')
+        # Lines with a comment are only counted as comments. The model was
+        # trained on the length of the last comment in the file, not the sum.
+        comment_start = line.find(comment_marker)
         if comment_start != -1:
             total_comments += 1
-            total_comments_len = len(line[comment_start+2:].strip())
+            last_comment_len = len(line[comment_start+len(comment_marker):].strip())
+            continue
+
+        # Indentation
+        if count_indentation:
+            if indent_width is None:
+                indentation = len(line) - len(line.lstrip('\t'))
+            else:
+                prefix = line[:len(line) - len(line.lstrip(' \t'))]
+                indentation = prefix.count('\t') + prefix.count(' ') // indent_width
+            total_indentation += indentation
+            if indentation > max_indentation:
+                max_indentation = indentation
+
+        # Strings
+        if count_strings:
+            for quote in string_quotes:
+                if quote in line:
+                    for match in string_pattern.finditer(line):
+                        total_strings += 1
+                        total_strings_len += len(match.group(match.lastindex))
+                    break
+
+        if not strip_literals:
             continue
-           
 
         # Remove strings and character literals to avoid counting operators inside them
-        stripped_line = re.sub(r'"(\\.|[^"\\])*"', '', stripped_line)
-        stripped_line = re.sub(r"'(\\.|[^'\\])*'", '', stripped_line)
+        code_line = line
+        for quote, pattern in literals:
+            if quote in code_line:
+                code_line = pattern.sub('', code_line)
 
         # Line length
-        line_length = len(stripped_line)
-        total_line_length += line_length
-        max_line_length = max(max_line_length, line_length)
-
-        # Indentation
-        indentation = len(line) - len(line.lstrip('\t'))
-        total_indentation += indentation
-        max_indentation = max(max_indentation, indentation)
-
-        # Identifiers
-        identifiers = identifier_pattern.findall(stripped_line)
-        identifiers = [id for id in identifiers if id not in go_keywords and not number_pattern.match(id)]
-        num_identifiers = len(identifiers)
-        total_identifiers += num_identifiers
-        max_identifiers = max(max_identifiers, num_identifiers)
-
-        # Identifier lengths
-        identifier_lengths = [len(id) for id in identifiers]
-        if identifier_lengths:
-            max_id_length_in_line = max(identifier_lengths)
-            max_identifier_length = max(max_identifier_length, max_id_length_in_line)
-            total_identifier_length += sum(identifier_lengths)
-
-        # Keywords
-        keywords_in_line = [word for word in identifiers if word in go_keywords]
-        num_keywords = len([word for word in identifier_pattern.findall(stripped_line) if word in go_keywords])
-        total_keywords += num_keywords
-        max_keywords = max(max_keywords, num_keywords)
-
-        # Numbers
-        numbers_in_line = number_pattern.findall(stripped_line)
-        num_numbers = len(numbers_in_line)
-        total_numbers += num_numbers
-        max_numbers = max(max_numbers, num_numbers)
+        if count_line_length:
+            line_length = len(code_line)
+            total_line_length += line_length
+            if line_length > max_line_length:
+                max_line_length = line_length
 
-        # Strings
-        strings = re.findall(r'"(.*?)"', line)
-        if strings:
-            total_strings += len(strings)
-            total_strings_len += sum(len(s) for s in strings)
+        # Identifiers, keywords and numbers
+        if count_tokens or count_numbers:
+            tokens.add(code_line)
 
         # Periods, commas, spaces, parentheses
-        total_periods += stripped_line.count('.')
-        total_commas += stripped_line.count(',')
-        total_spaces += stripped_line.count(' ')
-        total_parentheses += stripped_line.count('(') + stripped_line.count(')') + stripped_line.count('{') + stripped_line.count('}')
-
-    # Compute averages
-    avg_line_length = total_line_length / total_lines if total_lines else 0
-    avg_identifiers = total_identifiers / total_lines if total_lines else 0
-    avg_identifier_length = total_identifier_length / total_identifiers if total_identifiers else 0
-    avg_indentation = total_indentation / total_lines if total_lines else 0
-    avg_keywords = total_keywords / total_lines if total_lines else 0
-    avg_numbers = total_numbers / total_lines if total_lines else 0
-    avg_comments = total_comments / total_lines if total_lines else 0
-    avg_comment_len = total_comments_len / total_comments if total_comments else 0
-    avg_strings = total_strings / total_lines if total_lines else 0
-    avg_strings_len = total_strings_len / total_strings if total_strings else 0
-    avg_periods_and_commas = (total_periods+total_commas) / total_lines if total_lines else 0
-    avg_commas = total_commas / total_lines if total_lines else 0
-    avg_spaces = total_spaces / total_lines if total_lines else 0
-    avg_parentheses = total_parentheses / total_lines if total_lines else 0
-    avg_blank_lines = total_blank_lines / total_lines if total_lines else 0
-
-    # Output only the ones used in the model
-    features = {
-        'avg_strings': avg_strings,
-        'avg_line_length': avg_line_length,
-        'avg_commas_periods': avg_periods_and_commas,
-        'avg_num_identifiers': avg_identifiers,
-        'avg_keywords': avg_keywords,
-        'avg_strings_len': avg_strings_len,
-        'avg_comment_len': avg_comment_len,
-        'avg_identifier_len': avg_identifier_length,
+        if count_periods:
+            total_periods += code_line.count('.')
+        if count_commas:
+            total_commas += code_line.count(',')
+        if count_spaces:
+            total_spaces += code_line.count(' ')
+        if count_parentheses:
+            total_parentheses += (code_line.count('(') + code_line.count(')')
+                                  + code_line.count('{') + code_line.count('}'))
+
+    token_counters = tokens.counters()
+    return {
+        'total_lines': total_lines,
+        'total_line_length': total_line_length,
+        'max_line_length': max_line_length,
+        'total_identifiers': token_counters['total_identifiers'],
+        'max_identifiers': token_counters['max_identifiers'],
+        'total_identifier_length': token_counters['total_identifier_length'],
+        'max_identifier_length': token_counters['max_identifier_length'],
+        'total_indentation': total_indentation,
+        'max_indentation': max_indentation,
+        'total_keywords': token_counters['total_keywords'],
+        'max_keywords': token_counters['max_keywords'],
+        'total_numbers': token_counters['total_numbers'],
+        'max_numbers': token_counters['max_numbers'],
+        'total_comments': total_comments,
+        'last_comment_len': last_comment_len,
+        'total_strings': total_strings,
+        'total_strings_len': total_strings_len,
+        'total_periods': total_periods,
+        'total_commas': total_commas,
+        'total_spaces': total_spaces,
+        'total_parentheses': total_parentheses,
+        'total_blank_lines': total_blank_lines,
+    }
+
+def compute_features(counters, feature_names=DEFAULT_FEATURES):
+    return {name: FEATURE_DEFINITIONS[name].compute(counters) for name in feature_names}
+
+def extract_features(code, language=DEFAULT_LANGUAGE, feature_names=DEFAULT_FEATURES):
+    # Only the counters the requested features are computed from are collected
+    return compute_features(scan_code(code, language, required_counters(feature_names)), feature_names)
+
+def iter_file_lines(file_path, chunk_size=STREAMING_CHUNK_SIZE, hasher=None):
+    # Yields the same lines as str.splitlines() on the decoded file while
+    # holding only one chunk and one partial line in memory
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if hasher is not None:
+                hasher.update(chunk)
+            lines = (pending + decoder.decode(chunk, final=not chunk)).splitlines(keepends=True)
+            # The last line may continue in the next chunk, including a "\r"
+            # that turns out to be the first half of "\r\n"
+            pending = lines.pop() if chunk and lines else ''
+            for line in lines:
+                yield line.splitlines()[0]
+            if not chunk:
+                break
+
+def extract_large_file_features(file_path, chunk_size=STREAMING_CHUNK_SIZE, language=DEFAULT_LANGUAGE,
+                                feature_names=DEFAULT_FEATURES):
+    hasher = content_hasher()
+    counters = scan_lines(iter_file_lines(file_path, chunk_size, hasher), language, required_counters(feature_names))
+    return compute_features(counters, feature_names), counters['total_lines'], hasher.hexdigest()
+
+# Bytes that make the vectorized path disagree with str.splitlines() and
+# str.isspace(): other line separators and anything outside ASCII
+NON_VECTORIZABLE_BYTES = np.zeros(256, dtype=bool)
+NON_VECTORIZABLE_BYTES[[0x0b, 0x0c, 0x0d, 0x1c, 0x1d, 0x1e]] = True
+NON_VECTORIZABLE_BYTES[0x80:] = True
+
+def count_per_line(positions, newlines, num_lines):
+    # Line index of each position is the number of newlines before it
+    return np.bincount(np.searchsorted(newlines, positions), minlength=num_lines)
+
+def leading_tabs(chars, starts, num_lines):
+    # Only lines starting at the first tab of a run of tabs are indented
+    tabs = np.flatnonzero(chars == 9)
+    indentation = np.zeros(num_lines, dtype=np.int64)
+    if not len(tabs):
+        return indentation
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(tabs) != 1) + 1))
+    run_lengths = np.diff(np.concatenate((run_starts, [len(tabs)])))
+    run_positions = tabs[run_starts]
+    index = np.minimum(np.searchsorted(run_positions, starts), len(run_positions) - 1)
+    indented = run_positions[index] == starts
+    indentation[indented] = run_lengths[index[indented]]
+    return indentation
+
+def count_characters(data):
+    # Per-line character statistics of an ASCII file with "\n" line endings,
+    # computed with array operations over the whole file
+    chars = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(chars == 10)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(chars)]))
+    if not len(chars) or chars[-1] == 10:
+        # str.splitlines() has no empty line after a trailing newline
+        starts, ends = starts[:-1], ends[:-1]
+    num_lines = len(starts)
+    lengths = ends - starts
+
+    whitespace = count_per_line(np.flatnonzero((chars == 32) | (chars == 9) | (chars == 31)), newlines, num_lines)
+    blank = whitespace == lengths
+    slashes = np.flatnonzero((chars[:-1] == 47) & (chars[1:] == 47))
+    comment = ~blank & (count_per_line(slashes, newlines, num_lines) > 0)
+    quoted = count_per_line(np.flatnonzero((chars == 34) | (chars == 39)), newlines, num_lines) > 0
+
+    return {
+        'num_lines': num_lines,
+        'starts': starts,
+        'ends': ends,
+        'lengths': lengths,
+        'blank': blank,
+        'comment': comment,
+        'quoted': quoted,
+        'indentation': leading_tabs(chars, starts, num_lines),
+        'periods': count_per_line(np.flatnonzero(chars == 46), newlines, num_lines),
+        'commas': count_per_line(np.flatnonzero(chars == 44), newlines, num_lines),
+        'spaces': count_per_line(np.flatnonzero(chars == 32), newlines, num_lines),
+        'parentheses': count_per_line(
+            np.flatnonzero((chars == 40) | (chars == 41) | (chars == 123) | (chars == 125)), newlines, num_lines),
     }
 
-    return features
+def scan_go_bytes(data, counters=ALL_COUNTERS):
+    # Same counters as scan_code(data.decode('utf-8'), 'go', counters). Character
+    # statistics come from count_characters, only the token counts are computed
+    # per line, and only when requested.
+    if NON_VECTORIZABLE_BYTES[np.frombuffer(data, dtype=np.uint8)].any():
+        return scan_code(data.decode('utf-8'), 'go', counters)
+    count_tokens = not TOKEN_COUNTERS.isdisjoint(counters)
+    count_numbers = not NUMBER_COUNTERS.isdisjoint(counters)
+
+    tables = lexer_tables('go')
+    literals = tables.literals
+    stats = count_characters(data)
+    text = data.decode('ascii')
+    starts = stats['starts'].tolist()
+    ends = stats['ends'].tolist()
+    code = ~stats['blank'] & ~stats['comment']
+    plain = code & ~stats['quoted']
+
+    # Lines without quotes need no literal removal, so all their character
+    # counts come straight from the arrays
+    plain_lengths = stats['lengths'][plain]
+    code_indentation = stats['indentation'][code]
+    total_line_length = int(plain_lengths.sum())
+    max_line_length = int(plain_lengths.max()) if len(plain_lengths) else 0
+    total_indentation = int(code_indentation.sum())
+    max_indentation = int(code_indentation.max()) if len(code_indentation) else 0
+    total_periods = int(stats['periods'][plain].sum())
+    total_commas = int(stats['commas'][plain].sum())
+    total_spaces = int(stats['spaces'][plain].sum())
+    total_parentheses = int(stats['parentheses'][plain].sum())
+
+    total_comments = int(stats['comment'].sum())
+    last_comment_len = 0
+    if total_comments:
+        # The model uses the length of the last comment in the file
+        i = int(np.flatnonzero(stats['comment'])[-1])
+        line = text[starts[i]:ends[i]]
+        last_comment_len = len(line[line.find('//')+2:].strip())
+
+    tokens = TokenCounter(tables, count_tokens, count_numbers)
+    total_strings = 0
+    total_strings_len = 0
+
+    quoted = stats['quoted'].tolist()
+    # Without token counts only the lines with literals need a closer look
+    scanned = code if count_tokens or count_numbers else code & stats['quoted']
+    for i in np.flatnonzero(scanned).tolist():
+        line = text[starts[i]:ends[i]]
+        code_line = line
+        if quoted[i]:
+            # Remove strings and character literals to avoid counting operators inside them
+            for quote, pattern in literals:
+                if quote in code_line:
+                    code_line = pattern.sub('', code_line)
+            line_length = len(code_line)
+            total_line_length += line_length
+            if line_length > max_line_length:
+                max_line_length = line_length
+            total_periods += code_line.count('.')
+            total_commas += code_line.count(',')
+            total_spaces += code_line.count(' ')
+            total_parentheses += code_line.count('(') + code_line.count(')') + code_line.count('{') + code_line.count('}')
+            if '"' in line:
+                strings = tables.string.findall(line)
+                total_strings += len(strings)
+                for string in strings:
+                    total_strings_len += len(string)
+
+        if count_tokens or count_numbers:
+            tokens.add(code_line)
+
+    token_counters = tokens.counters()
+    return {
+        'total_lines': stats['num_lines'],
+        'total_line_length': total_line_length,
+        'max_line_length': max_line_length,
+        'total_identifiers': token_counters['total_identifiers'],
+        'max_identifiers': token_counters['max_identifiers'],
+        'total_identifier_length': token_counters['total_identifier_length'],
+        'max_identifier_length': token_counters['max_identifier_length'],
+        'total_indentation': total_indentation,
+        'max_indentation': max_indentation,
+        'total_keywords': token_counters['total_keywords'],
+        'max_keywords': token_counters['max_keywords'],
+        'total_numbers': token_counters['total_numbers'],
+        'max_numbers': token_counters['max_numbers'],
+        'total_comments': total_comments,
+        'last_comment_len': last_comment_len,
+        'total_strings': total_strings,
+        'total_strings_len': total_strings_len,
+        'total_periods': total_periods,
+        'total_commas': total_commas,
+        'total_spaces': total_spaces,
+        'total_parentheses': total_parentheses,
+        'total_blank_lines': int(stats['blank'].sum()),
+    }
 
 def load_readability_ratings(ratings_file):
-    ratings_dict = {}  # filename -> list of ratings
-    with open(ratings_file, 'r', encoding='utf-8') as f:
+    # Ratings are streamed row by row into a running sum and count, so memory
+    # depends on the number of snippets, not on the size of the rating log
+    ratings_dict = {}  # filename -> [sum of ratings, number of ratings]
+    with open(ratings_file, 'r', encoding='utf-8', newline='') as f:
         reader = csv.reader(f)
         header = next(reader)  # Skip header
         for row in reader:
@@ -167,22 +487,187 @@ def load_readability_ratings(ratings_file):
                 rating = float(rating)
             except ValueError:
                 continue  # Skip rows with invalid rating
-            if filename in ratings_dict:
-                ratings_dict[filename].append(rating)
+            totals = ratings_dict.get(filename)
+            if totals is None:
+                ratings_dict[filename] = [rating, 1]
             else:
-                ratings_dict[filename] = [rating]
+                totals[0] += rating
+                totals[1] += 1
     average_ratings = {}
-    for filename, ratings in ratings_dict.items():
-        average_ratings[filename] = sum(ratings) / len(ratings)
+    for filename, (total, count) in ratings_dict.items():
+        average_ratings[filename] = total / count
     return average_ratings
 
+FIELDNAMES = [
+    'snippet_filename', 'readability_rating', 'total_lines', 'avg_line_length', 'max_line_length',
+    'avg_num_identifiers', 'max_num_identifiers', 'avg_identifier_len', 'max_identifier_len',
+    'avg_indentation', 'max_indentation', 'avg_keywords', 'avg_numbers', 'avg_comments',
+    'avg_comment_len', 'avg_strings', 'avg_strings_len', 'avg_commas_periods', 'avg_spaces',
+    'avg_parenthesis', 'avg_blank_lines'
+]
+
+# Outcome of extracting one file. pid is None for results served from the
+# cache, whose line count is not known. read_seconds is the part of seconds
+# spent reading the file, zero when reading and scanning are interleaved.
+FileResult = namedtuple('FileResult', ['features', 'pid', 'num_bytes', 'seconds', 'key', 'num_lines', 'read_seconds'])
+
+def feature_cache_key(file_path, key):
+    # The same content has different features in another language. Go keys
+    # stay plain content hashes, so existing caches remain valid.
+    language = language_for_path(file_path)
+    return key if language == DEFAULT_LANGUAGE else f"{language}:{key}"
+
+def cached_features(cache, key, feature_names=DEFAULT_FEATURES):
+    # Entries written for another model may lack some of the features, those
+    # count as misses and are extracted again. Entries with more features only
+    # return the requested ones, so the output does not depend on the cache.
+    features = cache.get(key)
+    if features is None or any(name not in features for name in feature_names):
+        return None
+    return {name: features[name] for name in feature_names}
+
+def extract_file_features(file_path, feature_names=DEFAULT_FEATURES):
+    start = time.perf_counter()
+    num_bytes = os.path.getsize(file_path)
+    language = language_for_path(file_path)
+    read_seconds = 0.0
+    if num_bytes > STREAMING_THRESHOLD:
+        features, num_lines, key = extract_large_file_features(file_path, language=language,
+                                                               feature_names=feature_names)
+    else:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        read_seconds = time.perf_counter() - start
+        counters = required_counters(feature_names)
+        if language == 'go' and num_bytes >= VECTORIZE_THRESHOLD and counters == ALL_COUNTERS:
+            counters = scan_go_bytes(data, counters)
+        else:
+            counters = scan_code(data.decode('utf-8'), language, counters)
+        features = compute_features(counters, feature_names)
+        num_lines, key = counters['total_lines'], content_hash(data)
+        num_bytes = len(data)
+    key = feature_cache_key(file_path, key)
+    return FileResult(features, os.getpid(), num_bytes, time.perf_counter() - start, key, num_lines, read_seconds)
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def extract_files_features(file_paths, jobs=1, cache=None, feature_names=DEFAULT_FEATURES):
+    # Yields one result per file, in input order, as soon as it is available.
+    # file_paths may be a lazy iterator, e.g. a directory crawl, it is consumed
+    # one batch at a time and the worker pool is kept for all batches.
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else contextlib.nullcontext()
+    with pool as executor:
+        for batch in iter_batches(file_paths, EXTRACTION_BATCH_SIZE):
+            yield from extract_batch_features(batch, executor, jobs, cache, feature_names)
+
+def extract_batch_features(file_paths, executor=None, jobs=1, cache=None, feature_names=DEFAULT_FEATURES):
+    if cache is None:
+        yield from extract_uncached_files_features(file_paths, executor, jobs, feature_names)
+        return
+
+    lookups = []
+    for file_path in file_paths:
+        key, num_bytes = file_content_hash(file_path)
+        key = feature_cache_key(file_path, key)
+        lookups.append((file_path, key, num_bytes, cached_features(cache, key, feature_names)))
+
+    extracted = extract_uncached_files_features(
+        [file_path for file_path, _, _, features in lookups if features is None], executor, jobs, feature_names)
+    for file_path, key, num_bytes, features in lookups:
+        if features is None:
+            result = next(extracted)
+            # Store under the hash of the content the worker actually read
+            cache.put(result.key, result.features)
+            yield result
+        else:
+            # Cached files are not processed by any worker
+            yield FileResult(features, None, num_bytes, 0.0, key, 0, 0.0)
+    # Work of finished batches survives an interrupted run
+    cache.commit()
+
+def extract_uncached_files_features(file_paths, executor=None, jobs=1, feature_names=DEFAULT_FEATURES):
+    if executor is None:
+        for file_path in file_paths:
+            yield extract_file_features(file_path, feature_names)
+        return
+    # Executor.map keeps the input order, so the output matches the serial run
+    chunksize = max(1, len(file_paths) // (jobs * 4))
+    yield from executor.map(extract_file_features, file_paths, [feature_names] * len(file_paths),
+                            chunksize=chunksize)
+
+def update_worker_stats(workers, result):
+    # workers: pid -> [files, bytes, busy seconds], cached files are keyed by None
+    stats = workers.setdefault(result.pid, [0, 0, 0.0])
+    stats[0] += 1
+    stats[1] += result.num_bytes
+    stats[2] += result.seconds
+
+def report_worker_throughput(workers, wall_time):
+    num_cached = workers.get(None, [0])[0]
+    num_files = num_cached
+    for pid, (worker_files, num_bytes, busy) in sorted(item for item in workers.items() if item[0] is not None):
+        num_files += worker_files
+        files_per_sec = worker_files / busy if busy else 0
+        bytes_per_sec = num_bytes / busy if busy else 0
+        print(f"Worker {pid}: {worker_files} files, {busy:.2f}s busy, "
+              f"{files_per_sec:.1f} files/s, {bytes_per_sec / 1e6:.2f} MB/s", file=sys.stderr)
+    print(f"Total: {num_files} files ({num_cached} from cache) in {wall_time:.2f}s", file=sys.stderr)
+
+def iter_snippet_filenames(directory, average_ratings, shard=None, options=None):
+    # Source files under directory, relative to it, that have a rating and
+    # belong to the shard. Nested files are keyed like "sub/name.go".
+    for path in crawl(directory, source_extensions(), **(options or {})):
+        filename = os.path.relpath(path, directory)
+        if not in_shard(filename, shard):
+            continue
+        if filename not in average_ratings:
+            print(f"Warning: No readability rating for {filename}", file=sys.stderr)
+            continue  # Skip files without rating
+        yield filename
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract readability features from code snippets.")
+    parser.add_argument('directory', help="Directory with code snippets, searched recursively")
+    parser.add_argument('ratings_file', help="CSV file with filename and readability_rating columns")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of worker processes used for feature extraction (default: 1)")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite file used to cache features of unchanged files between runs")
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f"Evict least recently used cache entries above this count (default: {DEFAULT_MAX_ENTRIES})")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Drop all cached features before extracting")
+    parser.add_argument('--all-features', action='store_true',
+                        help="Compute every feature column instead of only the ones used in the model")
+    parser.add_argument('--format', choices=['csv', 'npy', 'parquet'], default='csv',
+                        help="Output format: CSV text, NumPy structured array or Parquet (default: csv)")
+    parser.add_argument('--output', metavar='PATH',
+                        help="Output file, required for npy and parquet (default: CSV on stdout)")
+    add_shard_argument(parser, "snippet files")
+    add_crawl_arguments(parser)
+    instrumentation.add_profiling_arguments(parser)
+    return parser.parse_args(argv)
+
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python extract_features.py <directory_path> <ratings_file_path>")
-        sys.exit(1)
-    
-    directory = sys.argv[1]
-    ratings_file = sys.argv[2]
+    args = parse_args()
+    profiler = instrumentation.start_profiling(args)
+    try:
+        extract(args)
+    finally:
+        instrumentation.finish_profiling(args, profiler)
+
+def extract(args):
+    metrics = instrumentation.metrics
+    directory = args.directory
+    ratings_file = args.ratings_file
     
     if not os.path.isdir(directory):
         print(f"Error: {directory} is not a valid directory.")
@@ -192,48 +677,58 @@ def main():
         print(f"Error: {ratings_file} is not a valid file.")
         sys.exit(1)
     
-    fieldnames = [
-        'snippet_filename', 'readability_rating', 'total_lines', 'avg_line_length', 'max_line_length',
-        'avg_num_identifiers', 'max_num_identifiers', 'avg_identifier_len', 'max_identifier_len',
-        'avg_indentation', 'max_indentation', 'avg_keywords', 'avg_numbers', 'avg_comments',
-        'avg_comment_len', 'avg_strings', 'avg_strings_len', 'avg_commas_periods', 'avg_spaces',
-        'avg_parenthesis', 'avg_blank_lines'
-    ]
-    
-    average_ratings = load_readability_ratings(ratings_file)
+    with metrics.stage('load_ratings'):
+        average_ratings = load_readability_ratings(ratings_file)
     
-    data = []
-    
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if os.path.isfile(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            features = extract_features(code)
-
-            readability_rating = average_ratings.get(filename, None)
-            if readability_rating is None:
-                print(f"Warning: No readability rating for {filename}", file=sys.stderr)
-                continue  # Skip files without rating
+    skipped = Counter()
+    filenames = iter_snippet_filenames(directory, average_ratings, args.shard, crawl_options(args, skipped))
+
+    cache = None
+    if args.cache:
+        cache = FeatureCache(args.cache, EXTRACTOR_VERSION, args.cache_max_entries)
+        if args.clear_cache:
+            cache.clear()
+
+    writer = open_feature_writer(args.format, FIELDNAMES, args.output)
+    workers = {}
+    start = time.perf_counter()
+    feature_names = ALL_FEATURES if args.all_features else DEFAULT_FEATURES
+    # Files are crawled lazily while earlier ones are extracted. Results come
+    # in input order, so each one belongs to the oldest pending filename.
+    pending = deque()
+    def file_paths():
+        for filename in filenames:
+            pending.append(filename)
+            yield os.path.join(directory, filename)
+    results = extract_files_features(file_paths(), args.jobs, cache, feature_names)
+    # Rows are written as soon as they are extracted instead of being collected first
+    with metrics.stage('extract_and_write'):
+        for result in results:
+            filename = pending.popleft()
+            update_worker_stats(workers, result)
+            if result.pid is None:
+                metrics.count('cached_files')
+            else:
+                metrics.record_file(filename, result.seconds, result.num_bytes, result.num_lines, result.read_seconds)
             # Combine filename, readability_rating, and features into one dictionary
             row = {
                 'snippet_filename': filename,
-                'readability_rating': readability_rating
+                'readability_rating': average_ratings[filename]
             }
-            row.update(features)
-            data.append(row)
-    
-    writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in data:
-        # Format float values to two decimal points
-        formatted_row = {}
-        for key, value in row.items():
-            if isinstance(value, float):
-                formatted_row[key] = f"{value:.2f}"
-            else:
-                formatted_row[key] = value
-        writer.writerow(formatted_row)
+            row.update(result.features)
+            writer.write(row)
+        writer.close()
+
+    report_skipped(skipped)
+    for name, value in skipped.items():
+        metrics.count(f"skipped_{name}", value)
+    if args.jobs > 1:
+        report_worker_throughput(workers, time.perf_counter() - start)
+    if cache is not None:
+        cache.close()
+        cache.report(file=sys.stderr)
+        for name, value in cache.stats().items():
+            metrics.count(f"cache_{name}", value)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
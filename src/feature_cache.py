@@ -0,0 +1,129 @@
+import json
+import time
+import sqlite3
+import hashlib
+
+DEFAULT_MAX_ENTRIES = 1000000
+
+# Files are hashed in chunks of this size so large files are never fully loaded
+HASH_CHUNK_SIZE = 1 << 20
+# New entries are buffered and written in one short transaction after this
+# many puts or seconds. No write lock is held between writes, so processes
+# sharing the cache are not locked out and an interrupted run keeps its work.
+COMMIT_INTERVAL = 100
+COMMIT_SECONDS = 1.0
+
+def content_hasher():
+    return hashlib.blake2b(digest_size=16)
+
+def content_hash(data):
+    hasher = content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+def file_content_hash(file_path):
+    hasher = content_hasher()
+    num_bytes = 0
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+            num_bytes += len(chunk)
+    return hasher.hexdigest(), num_bytes
+
+class FeatureCache:
+    """On-disk cache of extracted features keyed by file content hash.
+
+    Entries are stored together with the extractor version, so changing the
+    feature definitions (and bumping the version) invalidates old entries.
+    When the cache grows beyond max_entries the least recently used entries
+    are evicted on close. The database is opened in WAL mode, so concurrent
+    runs can read while another one commits its new entries.
+    """
+
+    def __init__(self, path, version, max_entries=DEFAULT_MAX_ENTRIES):
+        self.version = str(version)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._last_used = {}
+        self._pending = {}  # key -> features not written yet
+        self._first_pending = None
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            "content_hash TEXT NOT NULL, version TEXT NOT NULL, features TEXT NOT NULL, "
+            "last_used REAL NOT NULL, PRIMARY KEY (content_hash, version))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS features_last_used ON features (last_used)")
+        # Entries written by another extractor version can never be hit again
+        self.connection.execute("DELETE FROM features WHERE version != ?", (self.version,))
+        self.connection.commit()
+
+    def get(self, key):
+        if key in self._pending:
+            self.hits += 1
+            return json.loads(self._pending[key])
+        row = self.connection.execute(
+            "SELECT features FROM features WHERE content_hash = ? AND version = ?",
+            (key, self.version)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._last_used[key] = time.time()
+        return json.loads(row[0])
+
+    def put(self, key, features):
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+        self._pending[key] = json.dumps(features)
+        if len(self._pending) >= COMMIT_INTERVAL or time.monotonic() - self._first_pending >= COMMIT_SECONDS:
+            self.commit()
+
+    def commit(self):
+        now = time.time()
+        if self._pending:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO features (content_hash, version, features, last_used) VALUES (?, ?, ?, ?)",
+                [(key, self.version, features, now) for key, features in self._pending.items()])
+        self.connection.commit()
+        self._pending = {}
+        self._first_pending = None
+
+    def clear(self):
+        self.connection.execute("DELETE FROM features")
+        self.connection.commit()
+
+    def evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM features WHERE rowid IN "
+                "(SELECT rowid FROM features ORDER BY last_used LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def close(self):
+        self.commit()
+        # Access times of hits are written in one batch instead of per lookup
+        self.connection.executemany(
+            "UPDATE features SET last_used = ? WHERE content_hash = ? AND version = ?",
+            [(last_used, key, self.version) for key, last_used in self._last_used.items()])
+        self.evict()
+        self.connection.commit()
+        self.connection.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+            'evictions': self.evictions,
+        }
+
+    def report(self, file=None):
+        stats = self.stats()
+        print(f"Feature cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evictions", file=file)
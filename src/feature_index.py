@@ -0,0 +1,89 @@
+from collections import Counter
+from extract_features import DEFAULT_FEATURES, compute_features, required_counters, scan_lines
+from languages import DEFAULT_LANGUAGE
+
+# Counters in the order scan_lines() returns them
+COUNTER_NAMES = tuple(scan_lines([]))
+SUM_COUNTERS = [i for i, name in enumerate(COUNTER_NAMES) if name.startswith('total_')]
+MAX_COUNTERS = [i for i, name in enumerate(COUNTER_NAMES) if name.startswith('max_')]
+COMMENTS = COUNTER_NAMES.index('total_comments')
+LAST_COMMENT_LEN = COUNTER_NAMES.index('last_comment_len')
+
+class FeatureIndex:
+    """Per-line counter contributions of one file, kept up to date under line edits.
+
+    scan_lines() handles every line on its own, so a file's counters are the
+    sums, maxima and last comment length of its lines' counters. Each line's
+    contribution is stored, and an edit only scans the new lines and adjusts
+    the totals. Maxima are kept as multisets of the per-line values.
+    """
+
+    def __init__(self, code='', language=DEFAULT_LANGUAGE, feature_names=DEFAULT_FEATURES):
+        self.language = language
+        self.feature_names = tuple(feature_names)
+        self.counters_needed = required_counters(self.feature_names)
+        self.lines = []
+        self.contributions = []
+        self.totals = [0] * len(COUNTER_NAMES)
+        self.maxima = {i: Counter() for i in MAX_COUNTERS}
+        self.last_comment = None  # index of the last comment line
+        self.apply_edit(0, 0, code.splitlines())
+
+    def scan_line(self, line):
+        return tuple(scan_lines([line], self.language, self.counters_needed).values())
+
+    def apply_edit(self, start, end, new_lines):
+        """Replace lines [start, end) with new_lines, which must not contain line breaks."""
+        if not 0 <= start <= end <= len(self.lines):
+            raise ValueError(f"Invalid line range {start}-{end} for {len(self.lines)} lines")
+        added = [self.scan_line(line) for line in new_lines]
+        for contribution in self.contributions[start:end]:
+            self.update(contribution, -1)
+        for contribution in added:
+            self.update(contribution, 1)
+        self.lines[start:end] = new_lines
+        self.contributions[start:end] = added
+        self.update_last_comment(start, end, added)
+
+    def update(self, contribution, sign):
+        totals = self.totals
+        for i in SUM_COUNTERS:
+            totals[i] += sign * contribution[i]
+        for i, values in self.maxima.items():
+            value = contribution[i]
+            if value:
+                values[value] += sign
+                if not values[value]:
+                    del values[value]
+
+    def update_last_comment(self, start, end, added):
+        last = self.last_comment
+        new_comments = [i for i, contribution in enumerate(added) if contribution[COMMENTS]]
+        if last is not None and last >= end:
+            # The edit is before the last comment, which only moves
+            self.last_comment = last + len(added) - (end - start)
+        elif new_comments:
+            # No comment follows the edited range
+            self.last_comment = start + new_comments[-1]
+        elif last is not None and last >= start:
+            # The last comment was removed, search backwards from the edit
+            self.last_comment = None
+            for i in range(start - 1, -1, -1):
+                if self.contributions[i][COMMENTS]:
+                    self.last_comment = i
+                    break
+
+    def replace_text(self, start, end, text):
+        # Convenience for editors sending the new text of a line range
+        self.apply_edit(start, end, text.splitlines())
+
+    def counters(self):
+        counters = dict(zip(COUNTER_NAMES, self.totals))
+        for i, values in self.maxima.items():
+            counters[COUNTER_NAMES[i]] = max(values) if values else 0
+        if self.last_comment is not None:
+            counters['last_comment_len'] = self.contributions[self.last_comment][LAST_COMMENT_LEN]
+        return counters
+
+    def features(self):
+        return compute_features(self.counters(), self.feature_names)
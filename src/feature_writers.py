@@ -0,0 +1,171 @@
+import os
+import csv
+import sys
+import numpy as np
+
+# Filenames are stored as fixed-width strings so the .npy file can be memory-mapped.
+# The column starts this wide and is widened when a longer filename arrives.
+NPY_FILENAME_WIDTH = 256
+# Rows copied at a time when the filename column is widened
+NPY_REWRITE_CHUNK_ROWS = 100000
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+PARQUET_ROW_GROUP_SIZE = 10000
+
+class CsvFeatureWriter:
+    def __init__(self, fieldnames, output=sys.stdout):
+        self.fieldnames = fieldnames
+        self.output = output
+        self.writer = csv.writer(output)
+        self.writer.writerow(fieldnames)
+
+    def write(self, row):
+        # Format float values to two decimal points, missing features stay empty
+        values = []
+        for name in self.fieldnames:
+            value = row.get(name, '')
+            values.append(f"{value:.2f}" if isinstance(value, float) else value)
+        self.writer.writerow(values)
+
+    def close(self):
+        if self.output is sys.stdout:
+            self.output.flush()
+        else:
+            self.output.close()
+
+class NpyFeatureWriter:
+    """Streams rows into a .npy file holding a 1-d structured array.
+
+    The header is written with room for the largest possible row count and
+    rewritten with the real shape on close, so rows never have to be kept in
+    memory. Features that were not computed are stored as NaN. A filename
+    longer than the filename column rewrites the rows written so far with a
+    wider column, at least doubling it, so this happens only a few times.
+    """
+
+    def __init__(self, fieldnames, path):
+        self.fieldnames = fieldnames
+        self.path = path
+        self.width = NPY_FILENAME_WIDTH
+        self.dtype = self.make_dtype(self.width)
+        self.file = open(path, 'wb')
+        self.num_rows = 0
+        self.header_size = len(self.header(sys.maxsize))
+        self.file.write(self.header(0, self.header_size))
+
+    def make_dtype(self, width):
+        return np.dtype([(self.fieldnames[0], f'U{width}')] + [(name, 'f8') for name in self.fieldnames[1:]])
+
+    def header(self, num_rows, size=None):
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (num_rows,),
+        })
+        if size is None:
+            # Pad so the data starts 64-byte aligned, as np.save does
+            header += ' ' * (-(len(NPY_MAGIC) + 2 + len(header) + 1) % 64)
+        else:
+            header = header.ljust(size - len(NPY_MAGIC) - 3)
+        return NPY_MAGIC + len(header + '\n').to_bytes(2, 'little') + (header + '\n').encode('latin1')
+
+    def write(self, row):
+        filename = row[self.fieldnames[0]]
+        if len(filename) > self.width:
+            self.widen(max(len(filename), 2 * self.width))
+        record = np.array([(filename,) + tuple(float(row.get(name, np.nan)) for name in self.fieldnames[1:])],
+                          dtype=self.dtype)
+        self.file.write(record.tobytes())
+        self.num_rows += 1
+
+    def widen(self, width):
+        # Copies the rows into a new file in chunks, memory stays bounded
+        old_dtype, old_header_size = self.dtype, self.header_size
+        self.width = width
+        self.dtype = self.make_dtype(width)
+        self.header_size = len(self.header(sys.maxsize))
+        self.file.close()
+        temporary_path = self.path + '.tmp'
+        with open(self.path, 'rb') as source, open(temporary_path, 'wb') as target:
+            source.seek(old_header_size)
+            target.write(self.header(0, self.header_size))
+            for start in range(0, self.num_rows, NPY_REWRITE_CHUNK_ROWS):
+                count = min(NPY_REWRITE_CHUNK_ROWS, self.num_rows - start)
+                rows = np.frombuffer(source.read(count * old_dtype.itemsize), dtype=old_dtype)
+                target.write(rows.astype(self.dtype).tobytes())
+        os.replace(temporary_path, self.path)
+        self.file = open(self.path, 'r+b')
+        self.file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(self.header(self.num_rows, self.header_size))
+        self.file.close()
+
+class ParquetFeatureWriter:
+    def __init__(self, fieldnames, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Error: Parquet output requires pyarrow (pip install pyarrow).")
+            sys.exit(1)
+        self.pa = pa
+        self.fieldnames = fieldnames
+        self.schema = pa.schema([(fieldnames[0], pa.string())] + [(name, pa.float64()) for name in fieldnames[1:]])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = [[row[self.fieldnames[0]] for row in self.rows]]
+        for name in self.fieldnames[1:]:
+            columns.append([float(row[name]) if name in row else None for row in self.rows])
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+def open_feature_writer(output_format, fieldnames, path=None):
+    if output_format == 'csv':
+        if path is None:
+            return CsvFeatureWriter(fieldnames)
+        return CsvFeatureWriter(fieldnames, open(path, 'w', newline='', encoding='utf-8'))
+    if path is None:
+        print(f"Error: --output is required for {output_format} output.")
+        sys.exit(1)
+    if output_format == 'npy':
+        return NpyFeatureWriter(fieldnames, path)
+    return ParquetFeatureWriter(fieldnames, path)
+
+def load_feature_table(path):
+    # Binary outputs are read without parsing text, .npy files are memory-mapped
+    import pandas as pd
+    if path.endswith('.npy'):
+        return pd.DataFrame(np.load(path, mmap_mode='r'))
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def iter_feature_table(path, chunk_size, columns=None):
+    # Yields the table as DataFrames of at most chunk_size rows, so tables
+    # larger than memory can be processed
+    import pandas as pd
+    if path.endswith('.npy'):
+        table = np.load(path, mmap_mode='r')
+        for start in range(0, len(table), chunk_size):
+            chunk = pd.DataFrame(np.array(table[start:start + chunk_size]))
+            yield chunk if columns is None else chunk[columns]
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
@@ -0,0 +1,111 @@
+import sys
+import json
+import time
+import heapq
+import cProfile
+from contextlib import contextmanager, nullcontext
+
+DEFAULT_SLOWEST_FILES = 10
+
+class NullMetrics:
+    """Metrics sink used when profiling is disabled, every call is a no-op."""
+
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+    def count(self, name, value=1):
+        pass
+
+    def record_file(self, path, seconds, num_bytes, num_lines, read_seconds=0.0):
+        pass
+
+class Metrics:
+    """Per-stage timers, counters and the slowest files of one run."""
+
+    enabled = True
+
+    def __init__(self, slowest_files=DEFAULT_SLOWEST_FILES):
+        self.start = time.perf_counter()
+        self.stages = {}  # name -> [seconds, calls]
+        self.counters = {}
+        self.slowest_files = slowest_files
+        self._slowest = []  # min-heap of (seconds, path, bytes, lines)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.stages.setdefault(name, [0.0, 0])
+            stats[0] += time.perf_counter() - start
+            stats[1] += 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_file(self, path, seconds, num_bytes, num_lines, read_seconds=0.0):
+        self.count('files')
+        self.count('bytes', num_bytes)
+        self.count('lines', num_lines)
+        self.count('file_seconds', seconds)
+        self.count('read_seconds', read_seconds)
+        self.count('extract_seconds', seconds - read_seconds)
+        entry = (seconds, path, num_bytes, num_lines)
+        if len(self._slowest) < self.slowest_files:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def to_dict(self):
+        wall_time = time.perf_counter() - self.start
+        file_seconds = self.counters.get('file_seconds', 0)
+        rates = {}
+        if file_seconds:
+            # Rates over the time spent on files, which with --jobs is summed over workers
+            for name in ['files', 'bytes', 'lines']:
+                rates[f"{name}_per_sec"] = round(self.counters.get(name, 0) / file_seconds, 1)
+        return {
+            'wall_seconds': round(wall_time, 6),
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'counters': {name: round(value, 6) if isinstance(value, float) else value
+                         for name, value in self.counters.items()},
+            'rates': rates,
+            'slowest_files': [{'path': path, 'seconds': round(seconds, 6), 'bytes': num_bytes, 'lines': num_lines}
+                              for seconds, path, num_bytes, num_lines in sorted(self._slowest, reverse=True)],
+        }
+
+# Active metrics sink, replaced by start_profiling() when --profile is given
+metrics = NullMetrics()
+
+def add_profiling_arguments(parser):
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Write per-stage timings and counters as JSON to PATH (- for stderr)")
+    parser.add_argument('--profile-slowest', type=int, default=DEFAULT_SLOWEST_FILES,
+                        help=f"Number of slowest files listed in the profile (default: {DEFAULT_SLOWEST_FILES})")
+    parser.add_argument('--cprofile', metavar='PATH', help="Write cProfile statistics of the whole run to PATH")
+
+def start_profiling(args):
+    global metrics
+    if args.profile:
+        metrics = Metrics(args.profile_slowest)
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return None
+
+def finish_profiling(args, profiler=None):
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+    if metrics.enabled:
+        report = json.dumps(metrics.to_dict(), indent=2)
+        if args.profile == '-':
+            print(report, file=sys.stderr)
+        else:
+            with open(args.profile, 'w', encoding='utf-8') as f:
+                f.write(report + '\n')
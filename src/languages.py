@@ -0,0 +1,135 @@
+import os
+import re
+from collections import namedtuple
+
+DEFAULT_LANGUAGE = 'go'
+
+# Keywords and compiled patterns the extractor needs for one language:
+# - line_comment: marker starting a comment, lines containing it count as comments
+# - literals: (quote, pattern) pairs removed in order before counting tokens
+# - string: pattern whose last matching group is the content of a string literal
+# - string_quotes: characters that can start a string matched by string
+# - indent_width: spaces per indentation level, None counts only leading tabs
+LexerTables = namedtuple('LexerTables', ['keywords', 'line_comment', 'literals', 'string', 'string_quotes',
+                                         'identifier', 'number', 'indent_width'])
+
+NUMBER_PATTERN = r'\b\d+(\.\d+)?\b'
+IDENTIFIER_PATTERN = r'\b[_a-zA-Z][_a-zA-Z0-9\.]*\b'
+DOUBLE_QUOTED_PATTERN = r'"(\\.|[^"\\])*"'
+SINGLE_QUOTED_PATTERN = r"'(\\.|[^'\\])*'"
+# Character literals hold one (possibly escaped) character, which keeps Rust
+# lifetimes and similar uses of ' from swallowing code between them
+CHAR_PATTERN = r"'(\\.[^']*|[^'\\])'"
+
+_loaders = {}  # language -> function building its LexerTables
+_extensions = {}  # file extension -> language
+_tables = {}  # language -> LexerTables, filled on first use
+
+def register_language(name, extensions, loader):
+    """Register a language whose tables are built by loader() on first use."""
+    _loaders[name] = loader
+    _tables.pop(name, None)
+    for extension in extensions:
+        _extensions[extension] = name
+
+def lexer_tables(name):
+    tables = _tables.get(name)
+    if tables is None:
+        if name not in _loaders:
+            raise ValueError(f"Unknown language: {name}")
+        tables = _tables[name] = _loaders[name]()
+    return tables
+
+def language_for_path(path, default=DEFAULT_LANGUAGE):
+    return _extensions.get(os.path.splitext(path)[1].lower(), default)
+
+def source_extensions():
+    return tuple(sorted(_extensions))
+
+def languages():
+    return sorted(_loaders)
+
+def c_like_tables(keywords, literals=(('"', DOUBLE_QUOTED_PATTERN), ("'", CHAR_PATTERN)),
+                  string=r'"(.*?)"', string_quotes='"', indent_width=4):
+    return LexerTables(
+        keywords=frozenset(keywords),
+        line_comment='//',
+        literals=tuple((quote, re.compile(pattern)) for quote, pattern in literals),
+        string=re.compile(string),
+        string_quotes=string_quotes,
+        identifier=re.compile(IDENTIFIER_PATTERN),
+        number=re.compile(NUMBER_PATTERN),
+        indent_width=indent_width,
+    )
+
+def load_go():
+    # https://go101.org/article/keywords-and-identifiers.html
+    # Rune literals use the looser pattern the model was trained with
+    return c_like_tables([
+        'break', 'default', 'func', 'interface', 'select', 'case', 'defer', 'go',
+        'map', 'struct', 'chan', 'else', 'goto', 'package', 'switch', 'const',
+        'fallthrough', 'if', 'range', 'type', 'continue', 'for', 'import',
+        'return', 'var',
+    ], literals=(('"', DOUBLE_QUOTED_PATTERN), ("'", SINGLE_QUOTED_PATTERN)), indent_width=None)
+
+def load_python():
+    import keyword
+    return LexerTables(
+        keywords=frozenset(keyword.kwlist + getattr(keyword, 'softkwlist', [])),
+        line_comment='#',
+        literals=(('"', re.compile(DOUBLE_QUOTED_PATTERN)), ("'", re.compile(SINGLE_QUOTED_PATTERN))),
+        string=re.compile(r'"(.*?)"|\'(.*?)\''),
+        string_quotes='"\'',
+        identifier=re.compile(IDENTIFIER_PATTERN),
+        number=re.compile(NUMBER_PATTERN),
+        indent_width=4,
+    )
+
+def load_java():
+    return c_like_tables([
+        'abstract', 'assert', 'boolean', 'break', 'byte', 'case', 'catch', 'char', 'class', 'const',
+        'continue', 'default', 'do', 'double', 'else', 'enum', 'extends', 'final', 'finally', 'float',
+        'for', 'goto', 'if', 'implements', 'import', 'instanceof', 'int', 'interface', 'long', 'native',
+        'new', 'package', 'private', 'protected', 'public', 'return', 'short', 'static', 'strictfp',
+        'super', 'switch', 'synchronized', 'this', 'throw', 'throws', 'transient', 'try', 'void',
+        'volatile', 'while', 'var', 'record', 'yield', 'true', 'false', 'null',
+    ])
+
+def load_javascript():
+    # Also used for TypeScript, whose extra keywords are included
+    return c_like_tables([
+        'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger', 'default', 'delete', 'do',
+        'else', 'export', 'extends', 'finally', 'for', 'function', 'if', 'import', 'in', 'instanceof',
+        'new', 'return', 'super', 'switch', 'this', 'throw', 'try', 'typeof', 'var', 'void', 'while',
+        'with', 'yield', 'let', 'static', 'await', 'async', 'of', 'true', 'false', 'null', 'undefined',
+        'enum', 'implements', 'interface', 'package', 'private', 'protected', 'public', 'type',
+        'namespace', 'declare', 'readonly', 'abstract', 'as',
+    ], literals=(('"', DOUBLE_QUOTED_PATTERN), ("'", SINGLE_QUOTED_PATTERN), ('`', r'`(\\.|[^`\\])*`')),
+        string=r'"(.*?)"|\'(.*?)\'|`(.*?)`', string_quotes='"\'`', indent_width=2)
+
+def load_c():
+    # C and C++ share one keyword set
+    return c_like_tables([
+        'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do', 'double', 'else', 'enum',
+        'extern', 'float', 'for', 'goto', 'if', 'inline', 'int', 'long', 'register', 'restrict',
+        'return', 'short', 'signed', 'sizeof', 'static', 'struct', 'switch', 'typedef', 'union',
+        'unsigned', 'void', 'volatile', 'while', 'bool', 'catch', 'class', 'constexpr', 'delete',
+        'explicit', 'false', 'friend', 'mutable', 'namespace', 'new', 'noexcept', 'nullptr',
+        'operator', 'private', 'protected', 'public', 'template', 'this', 'throw', 'true', 'try',
+        'typename', 'using', 'virtual',
+    ])
+
+def load_rust():
+    return c_like_tables([
+        'as', 'async', 'await', 'break', 'const', 'continue', 'crate', 'dyn', 'else', 'enum', 'extern',
+        'false', 'fn', 'for', 'if', 'impl', 'in', 'let', 'loop', 'match', 'mod', 'move', 'mut', 'pub',
+        'ref', 'return', 'self', 'Self', 'static', 'struct', 'super', 'trait', 'true', 'type', 'unsafe',
+        'use', 'where', 'while',
+    ])
+
+register_language('go', ['.go'], load_go)
+register_language('python', ['.py', '.pyi'], load_python)
+register_language('java', ['.java'], load_java)
+register_language('javascript', ['.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx'], load_javascript)
+register_language('c', ['.c', '.h', '.cc', '.cpp', '.cxx', '.hh', '.hpp', '.hxx'], load_c)
+register_language('rust', ['.rs'], load_rust)
@@ -0,0 +1,153 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from collections import Counter
+import numpy as np
+
+FORMATS = ['csv', 'jsonl', 'npy', 'parquet']
+# Problems listed individually before they are summarized
+MAX_LISTED_PROBLEMS = 10
+
+def crawl_order(key):
+    # Sort key giving the order crawler.crawl() lists files in, which is the
+    # order of an unsharded run: a directory's files, sorted, before its
+    # subdirectories
+    *directories, filename = key.replace(os.sep, '/').split('/')
+    return [(1, directory) for directory in directories] + [(0, filename)]
+
+def shard_format(path):
+    for output_format in FORMATS:
+        if path.endswith('.' + output_format):
+            return output_format
+    return 'csv'
+
+def read_shards(paths, input_format):
+    # Returns the file key of every row and the rows of all shards, in input
+    # order. The key is the first column, which both scripts use for the file.
+    keys = []
+    if input_format == 'csv':
+        header = None
+        rows = []
+        for path in paths:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                shard_header = next(reader, None)
+                if header is not None and shard_header != header:
+                    raise ValueError(f"{path} has different columns than {paths[0]}")
+                header = shard_header
+                for row in reader:
+                    keys.append(row[0])
+                    rows.append(row)
+        return keys, (header, rows)
+    if input_format == 'jsonl':
+        lines = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        keys.append(next(iter(json.loads(line).values())))
+                        lines.append(line)
+        return keys, lines
+    if input_format == 'npy':
+        arrays = [np.load(path) for path in paths]
+        names = arrays[0].dtype.names
+        if any(array.dtype.names != names for array in arrays):
+            raise ValueError("Shards have different columns")
+        # Each shard sizes its filename column for its own longest filename
+        width = max(array.dtype[0].itemsize // np.dtype('U1').itemsize for array in arrays)
+        dtype = np.dtype([(names[0], f'U{width}')] + [(name, arrays[0].dtype[name]) for name in names[1:]])
+        table = np.concatenate([array.astype(dtype) for array in arrays])
+        return [str(key) for key in table[table.dtype.names[0]]], table
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.concat_tables([pq.read_table(path) for path in paths])
+    return [str(key) for key in table.column(0).to_pylist()], table
+
+def write_merged(data, order, output_format, output=None):
+    if output_format == 'csv':
+        header, rows = data
+        f = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in order:
+            writer.writerow(rows[i])
+        if output:
+            f.close()
+    elif output_format == 'jsonl':
+        f = open(output, 'w', encoding='utf-8') if output else sys.stdout
+        for i in order:
+            f.write(data[i])
+        if output:
+            f.close()
+    elif output_format == 'npy':
+        np.save(output, data[np.array(order, dtype=np.int64)])
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(data.take(order), output)
+
+def read_expected(path):
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    expected = {line.strip() for line in f if line.strip()}
+    if f is not sys.stdin:
+        f.close()
+    return expected
+
+def check_keys(keys, expected=None):
+    # Problems as (kind, key) pairs: files seen more than once, files
+    # missing from all shards and files nobody expected
+    problems = [('duplicate', key) for key, count in sorted(Counter(keys).items()) if count > 1]
+    if expected is not None:
+        seen = set(keys)
+        problems += [('missing', key) for key in sorted(expected - seen)]
+        problems += [('unexpected', key) for key in sorted(seen - expected)]
+    return problems
+
+def report_problems(problems):
+    for kind, key in problems[:MAX_LISTED_PROBLEMS]:
+        print(f"Error: {kind} file {key}", file=sys.stderr)
+    counts = Counter(kind for kind, _ in problems)
+    print("Error: " + ', '.join(f"{count} {kind}" for kind, count in sorted(counts.items())) + " files",
+          file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Merge the per-shard outputs of extract_features.py or rate_snippet.py --shard i/N "
+                    "into one dataset in the order of an unsharded run, checking for missing and duplicate files.")
+    parser.add_argument('shards', nargs='+', help="Shard outputs, all in the same format (.csv, .jsonl, .npy, .parquet)")
+    parser.add_argument('--output', metavar='PATH',
+                        help="Merged output in the format of the shards, required for npy and parquet "
+                             "(default: stdout)")
+    parser.add_argument('--expected', metavar='PATH',
+                        help="File listing every expected file key one per line (- for stdin), "
+                             "reports missing and unexpected files")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    input_format = shard_format(args.shards[0])
+    if any(shard_format(path) != input_format for path in args.shards):
+        print("Error: All shards must have the same format.")
+        sys.exit(1)
+    if input_format in ['npy', 'parquet'] and not args.output:
+        print(f"Error: --output is required for {input_format} shards.")
+        sys.exit(1)
+
+    try:
+        keys, data = read_shards(args.shards, input_format)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot read shards: {e}")
+        sys.exit(1)
+    problems = check_keys(keys, read_expected(args.expected) if args.expected else None)
+    if problems:
+        # Nothing is written, an incomplete dataset would look complete downstream
+        report_problems(problems)
+        sys.exit(1)
+
+    order = sorted(range(len(keys)), key=lambda i: crawl_order(keys[i]))
+    write_merged(data, order, input_format, args.output)
+    print(f"Merged {len(keys)} files from {len(args.shards)} shards", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from collections import namedtuple
+import numpy as np
+
+# Bump when the layout of the saved arrays changes
+MODEL_FORMAT_VERSION = 1
+
+Model = namedtuple('Model', ['feature_names', 'mean', 'std', 'coefficients', 'intercept'])
+
+def save_model(path, model):
+    # Plain uncompressed .npz, loaded without pickle or scikit-learn
+    np.savez(
+        path,
+        format_version=np.array(MODEL_FORMAT_VERSION),
+        feature_names=np.array(model.feature_names, dtype=str),
+        mean=np.asarray(model.mean, dtype=float),
+        std=np.asarray(model.std, dtype=float),
+        coefficients=np.asarray(model.coefficients, dtype=float),
+        intercept=np.array(float(model.intercept)),
+    )
+
+def load_model(path):
+    data = np.load(path, allow_pickle=False)
+    if not isinstance(data, np.lib.npyio.NpzFile):
+        # A .npy array, e.g. a feature table passed by mistake
+        raise ValueError(f"{path} is not a .npz model artifact")
+    with data:
+        format_version = int(data['format_version'])
+        if format_version != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {format_version} in {path}, "
+                             f"expected {MODEL_FORMAT_VERSION}")
+        model = Model(
+            feature_names=[str(name) for name in data['feature_names']],
+            mean=data['mean'],
+            std=data['std'],
+            coefficients=data['coefficients'],
+            intercept=float(data['intercept']),
+        )
+    num_features = len(model.feature_names)
+    if not (len(model.mean) == len(model.std) == len(model.coefficients) == num_features):
+        raise ValueError(f"Inconsistent model arrays in {path}")
+    return model
@@ -0,0 +1,220 @@
+import re
+import sys
+import csv
+import json
+import argparse
+import subprocess
+from extract_features import extract_features
+from rate_snippet import DEFAULT_MODEL, load_scoring_model, score_features
+
+# Top-level Go function declaration, optionally with a method receiver
+FUNC_PATTERN = re.compile(r'^func\s*(?:\(([^)]*)\)\s*)?([_a-zA-Z]\w*)')
+HUNK_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+# Diff output independent of the user's git config (noprefix, external diff
+# drivers, colors, quoted non-ASCII paths)
+DIFF_OPTIONS = ('--no-ext-diff', '--no-color', '--src-prefix=a/', '--dst-prefix=b/')
+
+def run_git(repo, *args, input=None):
+    result = subprocess.run(['git', '-C', repo, *args], input=input, capture_output=True)
+    if result.returncode != 0:
+        print(f"Error: git {' '.join(args)} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        sys.exit(1)
+    return result.stdout
+
+def changed_go_files(repo, base, head):
+    output = run_git(repo, 'diff', *DIFF_OPTIONS, '--name-status', '--no-renames', '-z', base, head, '--', '*.go')
+    fields = output.split(b'\0')
+    files = []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        try:
+            files.append((status.decode('utf-8'), path.decode('utf-8')))
+        except UnicodeDecodeError as e:
+            print(f"Warning: Skipping {path!r}: {e}", file=sys.stderr)
+    return files
+
+def read_blobs(repo, specs):
+    # Read all "<revision>:<path>" blobs with a single git process, as bytes
+    output = run_git(repo, 'cat-file', '--batch', input=''.join(f"{spec}\n" for spec in specs).encode('utf-8'))
+    blobs = []
+    pos = 0
+    for _ in specs:
+        header_end = output.index(b'\n', pos)
+        header = output[pos:header_end].split()
+        pos = header_end + 1
+        if header[-1] == b'missing':
+            blobs.append(None)
+            continue
+        size = int(header[2])
+        blobs.append(output[pos:pos + size])
+        pos += size + 1
+    return blobs
+
+def changed_line_ranges(repo, base, head):
+    # path -> ([(start, end)] in base, [(start, end)] in head), 1-based and inclusive
+    output = run_git(repo, '-c', 'core.quotePath=false', 'diff', *DIFF_OPTIONS, '-U0', '--no-renames',
+                     base, head, '--', '*.go').decode('utf-8', 'replace')
+    ranges = {}
+    old_path = new_path = None
+    for line in output.splitlines():
+        if line.startswith('--- '):
+            # Paths containing spaces are followed by a tab
+            old_path = line[6:].rstrip('\t') if line.startswith('--- a/') else None
+        elif line.startswith('+++ '):
+            new_path = line[6:].rstrip('\t') if line.startswith('+++ b/') else None
+        elif line.startswith('@@'):
+            match = HUNK_PATTERN.match(line)
+            if not match:
+                continue
+            old_start, old_count, new_start, new_count = match.groups()
+            old_count = int(old_count) if old_count is not None else 1
+            new_count = int(new_count) if new_count is not None else 1
+            base_ranges, head_ranges = ranges.setdefault(new_path or old_path, ([], []))
+            if old_count:
+                base_ranges.append((int(old_start), int(old_start) + old_count - 1))
+            if new_count:
+                head_ranges.append((int(new_start), int(new_start) + new_count - 1))
+    return ranges
+
+def find_go_functions(code):
+    # Relies on gofmt layout: a function body ends at the first "}" in column 0.
+    # Keyed by (name, occurrence), Go allows several init functions per file.
+    functions = {}
+    occurrences = {}
+    lines = code.splitlines()
+    i = 0
+    while i < len(lines):
+        match = FUNC_PATTERN.match(lines[i])
+        if not match:
+            i += 1
+            continue
+        receiver, name = match.groups()
+        if receiver:
+            receiver_type = receiver.split()[-1].lstrip('*').split('[')[0]
+            name = f"{receiver_type}.{name}"
+        start = i
+        if lines[i].count('{') == lines[i].count('}') and lines[i].rstrip().endswith('}'):
+            end = i
+        else:
+            end = i + 1
+            while end < len(lines) and lines[end] != '}':
+                end += 1
+            end = min(end, len(lines) - 1)
+        occurrence = occurrences.get(name, 0)
+        occurrences[name] = occurrence + 1
+        functions[(name, occurrence)] = (start + 1, end + 1, '\n'.join(lines[start:end + 1]))
+        i = end + 1
+    return functions
+
+def touched_functions(functions, line_ranges):
+    touched = set()
+    for key, (start, end, _) in functions.items():
+        for range_start, range_end in line_ranges:
+            if range_start <= end and start <= range_end:
+                touched.add(key)
+                break
+    return touched
+
+def function_label(key):
+    # The second init of a file is "init#2", unique names stay unchanged
+    name, occurrence = key
+    return name if occurrence == 0 else f"{name}#{occurrence + 1}"
+
+def score_codes(codes, model=DEFAULT_MODEL):
+    # Score the non-empty codes in one batch, None for missing ones
+    present = [i for i, code in enumerate(codes) if code is not None]
+    scores = score_features([extract_features(codes[i], feature_names=model.feature_names) for i in present], model)
+    result = [None] * len(codes)
+    for i, score in zip(present, scores):
+        result[i] = float(score)
+    return result
+
+def collect_changes(repo, base, head, functions=False):
+    files = changed_go_files(repo, base, head)
+    paths = []
+    base_codes = []
+    head_codes = []
+    for path, base_blob, head_blob in zip([path for _, path in files],
+                                          read_blobs(repo, [f"{base}:{path}" for _, path in files]),
+                                          read_blobs(repo, [f"{head}:{path}" for _, path in files])):
+        try:
+            base_code = base_blob.decode('utf-8') if base_blob is not None else None
+            head_code = head_blob.decode('utf-8') if head_blob is not None else None
+        except UnicodeDecodeError as e:
+            print(f"Warning: Skipping {path}: {e}", file=sys.stderr)
+            continue
+        paths.append(path)
+        base_codes.append(base_code)
+        head_codes.append(head_code)
+
+    if not functions:
+        return [{'filename': path} for path in paths], base_codes, head_codes
+
+    ranges = changed_line_ranges(repo, base, head)
+    rows = []
+    base_parts = []
+    head_parts = []
+    for path, base_code, head_code in zip(paths, base_codes, head_codes):
+        base_functions = find_go_functions(base_code) if base_code is not None else {}
+        head_functions = find_go_functions(head_code) if head_code is not None else {}
+        base_ranges, head_ranges = ranges.get(path, ([], []))
+        keys = touched_functions(base_functions, base_ranges) | touched_functions(head_functions, head_ranges)
+        for key in sorted(keys):
+            rows.append({'filename': path, 'function': function_label(key)})
+            base_parts.append(base_functions[key][2] if key in base_functions else None)
+            head_parts.append(head_functions[key][2] if key in head_functions else None)
+    return rows, base_parts, head_parts
+
+def format_score(score, sign=False):
+    if score is None:
+        return ''
+    return f"{score:+.2f}" if sign else f"{score:.2f}"
+
+def write_changes(rows, output_format, output=sys.stdout, functions=False):
+    fieldnames = ['filename', *(['function'] if functions else []), 'base_score', 'head_score', 'score_delta']
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            formatted_row = dict(row)
+            formatted_row['base_score'] = format_score(row['base_score'])
+            formatted_row['head_score'] = format_score(row['head_score'])
+            formatted_row['score_delta'] = format_score(row['score_delta'], sign=True)
+            writer.writerow(formatted_row)
+    else:
+        for row in rows:
+            rounded_row = {key: round(value, 2) if isinstance(value, float) else value for key, value in row.items()}
+            output.write(json.dumps(rounded_row) + '\n')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rate readability of Go files (or functions) changed between two git revisions.")
+    parser.add_argument('base', help="Base revision, e.g. origin/main")
+    parser.add_argument('head', nargs='?', default='HEAD', help="Revision with the changes (default: HEAD)")
+    parser.add_argument('--repo', default='.', help="Path to the git repository (default: current directory)")
+    parser.add_argument('--functions', action='store_true',
+                        help="Score only the func declarations touched by the change instead of whole files")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv', help="Output format (default: csv)")
+    parser.add_argument('--model', metavar='PATH',
+                        help="Model artifact written by train_model.py (default: built-in survey model)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+
+    model = load_scoring_model(args.model)
+
+    rows, base_codes, head_codes = collect_changes(args.repo, args.base, args.head, args.functions)
+    base_scores = score_codes(base_codes, model)
+    head_scores = score_codes(head_codes, model)
+    for row, base_score, head_score in zip(rows, base_scores, head_scores):
+        row['base_score'] = base_score
+        row['head_score'] = head_score
+        if base_score is not None and head_score is not None:
+            row['score_delta'] = head_score - base_score
+        else:
+            row['score_delta'] = None
+
+    write_changes(rows, args.format, functions=args.functions)
+
+if __name__ == "__main__":
+    main()
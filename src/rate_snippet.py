@@ -1,8 +1,19 @@
 import os
-import re
 import sys
+import csv
+import json
+import argparse
 import numpy as np
-import pandas as pd
+from collections import Counter
+from extract_features import EXTRACTOR_VERSION, cached_features, extract_file_features, feature_cache_key, required_counters
+from feature_cache import DEFAULT_MAX_ENTRIES, FeatureCache, file_content_hash
+from model_artifact import Model, load_model
+from crawler import add_crawl_arguments, crawl, crawl_options, report_skipped
+from languages import source_extensions
+from sharding import add_shard_argument, in_shard
+from feature_writers import load_feature_table
+from score_report import DEFAULT_BINS, DEFAULT_WORST_FILES, ScoreReport, write_report
+import instrumentation
 
 # All values come from the model trained on the data from survey.
 FEATURE_MEAN = np.array([0.07916667, 28.79916667, 1.49, 1.77666667, 0.36583333, 12.9, 15.22916667, 7.9025])
@@ -10,192 +21,252 @@ FEATURE_STD = np.array([0.14822945, 8.57692831, 0.75379042, 0.57920531, 0.143239
 
 MODEL_COEFFICIENTS = np.array([-0.32295017, -0.02162178, -0.14302383,  0.16994715,  0.53624519, -0.87802927, 0.94317421, -0.08688262])
 MODEL_INTERCEPT = -0.27823503
+MODEL_FEATURES = ['avg_strings', 'avg_line_length', 'avg_commas_periods', 'avg_num_identifiers',
+                  'avg_keywords', 'avg_strings_len', 'avg_comment_len', 'avg_identifier_len']
+
+DEFAULT_MODEL = Model(MODEL_FEATURES, FEATURE_MEAN, FEATURE_STD, MODEL_COEFFICIENTS, MODEL_INTERCEPT)
+
+def load_scoring_model(path=None):
+    # The built-in model without a path. Exits on unreadable artifacts and,
+    # before any file is scored, on features the extractor does not know.
+    if path is None:
+        return DEFAULT_MODEL
+    try:
+        model = load_model(path)
+        required_counters(model.feature_names)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: Cannot load model {path}: {e}")
+        sys.exit(1)
+    return model
 
-def extract_features(code):
-    # https://go101.org/article/keywords-and-identifiers.html
-    go_keywords = [
-        'break', 'default', 'func', 'interface', 'select', 'case', 'defer', 'go',
-        'map', 'struct', 'chan', 'else', 'goto', 'package', 'switch', 'const',
-        'fallthrough', 'if', 'range', 'type', 'continue', 'for', 'import',
-        'return', 'var',
-    ]
-
-    # Patterns for numbers, identifiers, comments etc.
-    number_pattern = re.compile(r'\b\d+(\.\d+)?\b')
-    identifier_pattern = re.compile(r'\b[_a-zA-Z][_a-zA-Z0-9\.]*\b')
-    comment_pattern = re.compile(r'//.*|/\*.*?\*/', re.DOTALL)
-    operator_pattern = re.compile(r'(\+\+|--|==|!=|<=|>=|<<|>>|&&|\|\||[\+\-\*/%&\|\^~<>]=?)')
-    whitespace_pattern = re.compile(r'\s+')
-
-    total_line_length = 0
-    max_line_length = 0
-
-    total_identifiers = 0
-    max_identifiers = 0
-
-    total_identifier_length = 0
-    max_identifier_length = 0
-
-    total_indentation = 0
-    max_indentation = 0
-
-    total_keywords = 0
-    max_keywords = 0
-
-    total_numbers = 0
-    max_numbers = 0
-
-    total_comments = 0
-    total_comments_len = 0
-    total_strings = 0
-    total_strings_len = 0
-    total_periods = 0
-    total_commas = 0
-    total_spaces = 0
-    total_parentheses = 0
-    total_arithmetic_ops = 0
-    total_comparison_ops = 0
-    total_assignments = 0
-    total_blank_lines = 0
-
-    total_lines = 0
-
-    in_block_comment = False
-
-    for line in code.splitlines():
-        total_lines += 1
-        stripped_line = line.strip('\n')
-
-        # Check for blank lines
-        if not stripped_line.strip():
-            total_blank_lines += 1
-            continue
+# Files scored together by iter_file_scores(), bounds memory in report mode
+SCORE_BATCH_SIZE = 1000
 
-        # Handle block comments
-        comment_start = stripped_line.find('//')
-        if comment_start != -1:
-            total_comments += 1
-            total_comments_len = len(line[comment_start+2:].strip())
-            continue
-           
-
-        # Remove strings and character literals to avoid counting operators inside them
-        stripped_line = re.sub(r'"(\\.|[^"\\])*"', '', stripped_line)
-        stripped_line = re.sub(r"'(\\.|[^'\\])*'", '', stripped_line)
-
-        # Line length
-        line_length = len(stripped_line)
-        total_line_length += line_length
-        max_line_length = max(max_line_length, line_length)
-
-        # Indentation
-        indentation = len(line) - len(line.lstrip('\t'))
-        total_indentation += indentation
-        max_indentation = max(max_indentation, indentation)
-
-        # Identifiers
-        identifiers = identifier_pattern.findall(stripped_line)
-        identifiers = [id for id in identifiers if id not in go_keywords and not number_pattern.match(id)]
-        num_identifiers = len(identifiers)
-        total_identifiers += num_identifiers
-        max_identifiers = max(max_identifiers, num_identifiers)
-
-        # Identifier lengths
-        identifier_lengths = [len(id) for id in identifiers]
-        if identifier_lengths:
-            max_id_length_in_line = max(identifier_lengths)
-            max_identifier_length = max(max_identifier_length, max_id_length_in_line)
-            total_identifier_length += sum(identifier_lengths)
-
-        # Keywords
-        keywords_in_line = [word for word in identifiers if word in go_keywords]
-        num_keywords = len([word for word in identifier_pattern.findall(stripped_line) if word in go_keywords])
-        total_keywords += num_keywords
-        max_keywords = max(max_keywords, num_keywords)
-
-        # Numbers
-        numbers_in_line = number_pattern.findall(stripped_line)
-        num_numbers = len(numbers_in_line)
-        total_numbers += num_numbers
-        max_numbers = max(max_numbers, num_numbers)
-
-        # Strings
-        strings = re.findall(r'"(.*?)"', line)
-        if strings:
-            total_strings += len(strings)
-            total_strings_len += sum(len(s) for s in strings)
-
-        # Periods, commas, spaces, parentheses
-        total_periods += stripped_line.count('.')
-        total_commas += stripped_line.count(',')
-        total_spaces += stripped_line.count(' ')
-        total_parentheses += stripped_line.count('(') + stripped_line.count(')') + stripped_line.count('{') + stripped_line.count('}')
-
-    # Compute averages
-    avg_line_length = total_line_length / total_lines if total_lines else 0
-    avg_identifiers = total_identifiers / total_lines if total_lines else 0
-    avg_identifier_length = total_identifier_length / total_identifiers if total_identifiers else 0
-    avg_indentation = total_indentation / total_lines if total_lines else 0
-    avg_keywords = total_keywords / total_lines if total_lines else 0
-    avg_numbers = total_numbers / total_lines if total_lines else 0
-    avg_comments = total_comments / total_lines if total_lines else 0
-    avg_comment_len = total_comments_len / total_comments if total_comments else 0
-    avg_strings = total_strings / total_lines if total_lines else 0
-    avg_strings_len = total_strings_len / total_strings if total_strings else 0
-    avg_periods_and_commas = (total_periods+total_commas) / total_lines if total_lines else 0
-    avg_commas = total_commas / total_lines if total_lines else 0
-    avg_spaces = total_spaces / total_lines if total_lines else 0
-    avg_parentheses = total_parentheses / total_lines if total_lines else 0
-    avg_blank_lines = total_blank_lines / total_lines if total_lines else 0
-
-    # Output only the ones used in the model
-    features = {
-        'avg_strings': avg_strings,
-        'avg_line_length': avg_line_length,
-        'avg_commas_periods': avg_periods_and_commas,
-        'avg_num_identifiers': avg_identifiers,
-        'avg_keywords': avg_keywords,
-        'avg_strings_len': avg_strings_len,
-        'avg_comment_len': avg_comment_len,
-        'avg_identifier_len': avg_identifier_length,
-    }
-
-    return features
-
-def normalize_features(features):
-    feature_array = np.array([features[feat] for feat in features])
-    normalized_features = (feature_array - FEATURE_MEAN) / FEATURE_STD
+def normalize_features(features, model=DEFAULT_MODEL):
+    feature_array = np.array([features[feat] for feat in model.feature_names])
+    normalized_features = (feature_array - model.mean) / model.std
     return normalized_features
 
-def calculate_readability_score(normalized_features):
-    score = np.dot(normalized_features, MODEL_COEFFICIENTS) + MODEL_INTERCEPT
+def calculate_readability_score(normalized_features, model=DEFAULT_MODEL):
+    score = np.dot(normalized_features, model.coefficients) + model.intercept
     return score
 
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
 
+def collect_input_files(paths, options=None):
+    # Expand the command line inputs: "-" reads a list of paths from stdin,
+    # directories are crawled recursively for files of registered languages
+    # with the crawl() options. Files named explicitly are never filtered.
+    extensions = source_extensions()
+    for path in paths:
+        if path == '-':
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(path):
+            yield from crawl(path, extensions, **(options or {}))
+        else:
+            yield path
+
+def shard_input_files(paths, shard=None, options=None):
+    # Files of the given shard only, all of them without --shard
+    for file_path in collect_input_files(paths, options):
+        if in_shard(file_path, shard):
+            yield file_path
+
+def normalize_feature_matrix(feature_matrix, model=DEFAULT_MODEL):
+    return (feature_matrix - model.mean) / model.std
+
+def read_file_features(file_path, cache=None, feature_names=MODEL_FEATURES):
+    # Only the features in feature_names are extracted
+    metrics = instrumentation.metrics
+    if cache is not None:
+        with metrics.stage('cache_lookup'):
+            key, _ = file_content_hash(file_path)
+            key = feature_cache_key(file_path, key)
+            features = cached_features(cache, key, feature_names)
+        if features is not None:
+            metrics.count('cached_files')
+            return features
+    result = extract_file_features(file_path, feature_names)
+    metrics.record_file(file_path, result.seconds, result.num_bytes, result.num_lines, result.read_seconds)
+    if cache is not None:
+        # Store under the hash of the content that was actually extracted
+        cache.put(result.key, result.features)
+    return result.features
+
+def score_files(file_paths, cache=None, model=DEFAULT_MODEL):
+    scored_paths = []
+    feature_rows = []
+    for file_path in file_paths:
+        try:
+            with instrumentation.metrics.stage('read_extract'):
+                features = read_file_features(file_path, cache, model.feature_names)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Warning: Skipping {file_path}: {e}", file=sys.stderr)
+            continue
+        feature_rows.append(features)
+        scored_paths.append(file_path)
+    return scored_paths, score_features(feature_rows, model)
+
+def iter_file_scores(file_paths, cache=None, model=DEFAULT_MODEL, batch_size=SCORE_BATCH_SIZE):
+    # Like score_files(), but yields (path, score) pairs and keeps at most one batch in memory
+    batch = []
+    for file_path in file_paths:
+        batch.append(file_path)
+        if len(batch) >= batch_size:
+            yield from zip(*score_files(batch, cache, model))
+            batch = []
+    if batch:
+        yield from zip(*score_files(batch, cache, model))
+
+def score_features(features_list, model=DEFAULT_MODEL):
+    if not features_list:
+        return np.empty(0)
+    metrics = instrumentation.metrics
+    # Stack all snippets into one matrix and score them with a single product
+    with metrics.stage('normalize'):
+        feature_matrix = np.array([[features[name] for name in model.feature_names] for features in features_list],
+                                  dtype=float)
+        normalized_features = normalize_feature_matrix(feature_matrix, model)
+    with metrics.stage('score'):
+        scores = sigmoid(calculate_readability_score(normalized_features, model))
+    return scores
+
+def score_feature_table(path, model=DEFAULT_MODEL):
+    # Score features written by extract_features.py without touching the sources
+    if path.endswith('.npy'):
+        table = np.load(path, mmap_mode='r')
+        filenames = table['snippet_filename']
+        feature_matrix = np.column_stack([table[name] for name in model.feature_names])
+    else:
+        table = load_feature_table(path)
+        filenames = table['snippet_filename']
+        feature_matrix = table[model.feature_names].to_numpy(dtype=float)
+    scores = calculate_readability_score(normalize_feature_matrix(feature_matrix, model), model)
+    return [str(filename) for filename in filenames], sigmoid(scores)
+
+def write_scores(file_paths, scores, output_format, output=sys.stdout):
+    if output_format == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(['filename', 'readability_score'])
+        for file_path, score in zip(file_paths, scores):
+            writer.writerow([file_path, f"{score:.2f}"])
+    else:
+        for file_path, score in zip(file_paths, scores):
+            output.write(json.dumps({'filename': file_path, 'readability_score': round(float(score), 2)}) + '\n')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rate readability of code snippets.")
+    parser.add_argument('inputs', nargs='*',
+                        help="Source files, directories to scan for source files, or - to read file paths from stdin")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                        help="Output per-file scores in batch mode (default: csv)")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite file used to cache features of unchanged files between runs")
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f"Evict least recently used cache entries above this count (default: {DEFAULT_MAX_ENTRIES})")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Drop all cached features before scoring")
+    parser.add_argument('--model', metavar='PATH',
+                        help="Model artifact written by train_model.py (default: built-in survey model)")
+    parser.add_argument('--features', metavar='PATH',
+                        help="Score a feature table written by extract_features.py (.csv, .npy or .parquet) "
+                             "instead of source files")
+    parser.add_argument('--report', metavar='PATH',
+                        help="Write only an aggregate report (score histogram, per-directory statistics, least "
+                             "readable files) to PATH, as HTML for .html paths and JSON otherwise (- for stdout)")
+    parser.add_argument('--report-bins', type=int, default=DEFAULT_BINS,
+                        help=f"Number of score histogram bins in the report (default: {DEFAULT_BINS})")
+    parser.add_argument('--report-worst', type=int, default=DEFAULT_WORST_FILES,
+                        help=f"Number of least readable files listed in the report (default: {DEFAULT_WORST_FILES})")
+    add_shard_argument(parser, "input files")
+    add_crawl_arguments(parser)
+    instrumentation.add_profiling_arguments(parser)
+    return parser.parse_args(argv)
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python rate_snippet.py <input_file>")
+    args = parse_args()
+    profiler = instrumentation.start_profiling(args)
+    try:
+        rate(args)
+    finally:
+        instrumentation.finish_profiling(args, profiler)
+
+def rate(args):
+    metrics = instrumentation.metrics
+    model = load_scoring_model(args.model)
+
+    cache = None
+    if args.cache:
+        cache = FeatureCache(args.cache, EXTRACTOR_VERSION, args.cache_max_entries)
+        if args.clear_cache:
+            cache.clear()
+
+    skipped = Counter()
+    options = crawl_options(args, skipped)
+    if args.report:
+        report = ScoreReport(args.report_bins, args.report_worst)
+        if args.features:
+            with metrics.stage('load_features'):
+                report.add_scores(*score_feature_table(args.features, model))
+        elif args.inputs:
+            for file_path, score in iter_file_scores(shard_input_files(args.inputs, args.shard, options), cache, model):
+                report.add(file_path, score)
+        else:
+            print("Error: No input files given.")
+            sys.exit(1)
+        with metrics.stage('write'):
+            write_report(report, args.report)
+        report_skipped(skipped)
+        if cache is not None:
+            cache.close()
+            cache.report(file=sys.stderr)
+        return
+
+    if args.features:
+        with metrics.stage('load_features'):
+            file_paths, scores = score_feature_table(args.features, model)
+        with metrics.stage('write'):
+            write_scores(file_paths, scores, args.format or 'csv')
+        return
+    if not args.inputs:
+        print("Error: No input files given.")
         sys.exit(1)
-    
-    input_file = sys.argv[1]
+
+    batch_mode = (args.format is not None or len(args.inputs) > 1 or args.shard is not None
+                  or args.inputs[0] == '-' or os.path.isdir(args.inputs[0]))
+    if batch_mode:
+        file_paths, scores = score_files(shard_input_files(args.inputs, args.shard, options), cache, model)
+        with metrics.stage('write'):
+            write_scores(file_paths, scores, args.format or 'csv')
+        report_skipped(skipped)
+        if cache is not None:
+            cache.close()
+            cache.report(file=sys.stderr)
+        return
+
+    input_file = args.inputs[0]
 
     if not os.path.exists(input_file):
         print(f"Error: File {input_file} does not exist.")
         sys.exit(1)
 
-    with open(input_file, 'r', encoding='utf-8') as file:
-        code = file.read()
-
-    features = extract_features(code)
-    normalized_features = normalize_features(features)
+    with metrics.stage('read_extract'):
+        features = read_file_features(input_file, cache, model.feature_names)
+    if cache is not None:
+        cache.close()
+    with metrics.stage('normalize'):
+        normalized_features = normalize_features(features, model)
 
-    score = np.dot(normalized_features, MODEL_COEFFICIENTS) + MODEL_INTERCEPT
+    with metrics.stage('score'):
+        score = calculate_readability_score(normalized_features, model)
     # Convert the score to [0, 1] using the sigmoid function
     normalized_score = sigmoid(score)
 
     print(f"Readability score: {normalized_score:.2f}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
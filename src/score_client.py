@@ -0,0 +1,60 @@
+# Thin client for scoring_server.py. It only uses the standard library, so
+# starting it does not pay for importing NumPy or the extractor.
+import os
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+def request_json(url, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rate Go code snippets using a running scoring server.")
+    parser.add_argument('inputs', nargs='*', help="Go files to rate, - reads one snippet from stdin")
+    parser.add_argument('--url', default=os.environ.get('READABILITY_SERVER_URL', DEFAULT_URL),
+                        help=f"Scoring server URL (default: $READABILITY_SERVER_URL or {DEFAULT_URL})")
+    parser.add_argument('--stats', action='store_true', help="Print server request latency statistics")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+
+    try:
+        if args.stats:
+            print(json.dumps(request_json(args.url + '/stats')))
+            return
+        if not args.inputs:
+            print("Error: No input files given.")
+            sys.exit(1)
+
+        snippets = []
+        for input_file in args.inputs:
+            if input_file == '-':
+                snippets.append({'name': '-', 'code': sys.stdin.read()})
+                continue
+            if not os.path.exists(input_file):
+                print(f"Error: File {input_file} does not exist.")
+                sys.exit(1)
+            with open(input_file, 'r', encoding='utf-8') as file:
+                snippets.append({'name': input_file, 'code': file.read()})
+
+        scores = request_json(args.url + '/score', {'snippets': snippets})['scores']
+    except urllib.error.URLError as e:
+        print(f"Error: Cannot reach scoring server at {args.url}: {e.reason}")
+        sys.exit(1)
+
+    if len(snippets) == 1:
+        print(f"Readability score: {scores[0]:.2f}")
+    else:
+        for snippet, score in zip(snippets, scores):
+            print(f"{snippet['name']},{score:.2f}")
+
+if __name__ == "__main__":
+    main()
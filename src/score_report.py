@@ -0,0 +1,143 @@
+import sys
+import html
+import json
+import heapq
+import os
+
+DEFAULT_BINS = 20
+DEFAULT_WORST_FILES = 100
+
+class RunningStats:
+    """Count, mean, standard deviation, min and max of a stream of values."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value):
+        # Welford's update, numerically stable without keeping the values
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 4),
+            'std': round((self.m2 / self.count) ** 0.5, 4),
+            'min': round(self.min, 4),
+            'max': round(self.max, 4),
+        }
+
+class ScoreReport:
+    """Aggregates a stream of (path, score) pairs in bounded memory.
+
+    Keeps running statistics of all scores, a histogram with fixed bins over
+    [0, 1], running statistics per directory (a Go package) and a heap of the
+    least readable files. Memory grows with the number of directories, never
+    with the number of files.
+    """
+
+    def __init__(self, bins=DEFAULT_BINS, worst_files=DEFAULT_WORST_FILES):
+        self.stats = RunningStats()
+        self.histogram = [0] * bins
+        self.directories = {}
+        self.worst_files = worst_files
+        self._worst = []  # max-heap of (-score, path)
+
+    def add(self, path, score):
+        score = float(score)
+        self.stats.add(score)
+        bins = len(self.histogram)
+        self.histogram[min(max(int(score * bins), 0), bins - 1)] += 1
+        directory = os.path.dirname(path) or '.'
+        stats = self.directories.get(directory)
+        if stats is None:
+            stats = self.directories[directory] = RunningStats()
+        stats.add(score)
+        entry = (-score, path)
+        if len(self._worst) < self.worst_files:
+            heapq.heappush(self._worst, entry)
+        elif self._worst and entry > self._worst[0]:
+            heapq.heapreplace(self._worst, entry)
+
+    def add_scores(self, paths, scores):
+        for path, score in zip(paths, scores):
+            self.add(path, score)
+
+    def to_dict(self):
+        bins = len(self.histogram)
+        return {
+            'files': self.stats.count,
+            'score': self.stats.to_dict(),
+            'histogram': [{'low': round(i / bins, 4), 'high': round((i + 1) / bins, 4), 'count': count}
+                          for i, count in enumerate(self.histogram)],
+            'directories': {directory: self.directories[directory].to_dict()
+                            for directory in sorted(self.directories)},
+            'worst_files': [{'path': path, 'score': round(-negative_score, 4)}
+                            for negative_score, path in sorted(self._worst, reverse=True)],
+        }
+
+def render_html(summary):
+    escape = html.escape
+    score = summary['score']
+    largest_bin = max([row['count'] for row in summary['histogram']] + [1])
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8"><title>Readability report</title>',
+        '<style>body{font-family:sans-serif}table{border-collapse:collapse}'
+        'td,th{padding:2px 8px;text-align:right}td.path{text-align:left}'
+        '.bar{background:#4a7ebb;height:12px}</style></head><body>',
+        '<h1>Readability report</h1>',
+    ]
+    overview = f"{summary['files']} files"
+    if score['count']:
+        overview += (f", mean score {score['mean']:.2f} (std {score['std']:.2f}, "
+                     f"min {score['min']:.2f}, max {score['max']:.2f})")
+    parts.append(f"<p>{overview}</p>")
+
+    parts.append('<h2>Score distribution</h2><table><tr><th>Score</th><th>Files</th><th></th></tr>')
+    for row in summary['histogram']:
+        width = round(300 * row['count'] / largest_bin)
+        parts.append(f"<tr><td>{row['low']:.2f}&ndash;{row['high']:.2f}</td><td>{row['count']}</td>"
+                     f"<td class=\"path\"><div class=\"bar\" style=\"width:{width}px\"></div></td></tr>")
+    parts.append('</table>')
+
+    parts.append(f"<h2>{len(summary['worst_files'])} least readable files</h2>"
+                 '<table><tr><th>Score</th><th>File</th></tr>')
+    for row in summary['worst_files']:
+        parts.append(f"<tr><td>{row['score']:.2f}</td><td class=\"path\">{escape(row['path'])}</td></tr>")
+    parts.append('</table>')
+
+    parts.append('<h2>Directories</h2><table><tr><th>Directory</th><th>Files</th><th>Mean</th>'
+                 '<th>Std</th><th>Min</th><th>Max</th></tr>')
+    for directory, stats in summary['directories'].items():
+        parts.append(f"<tr><td class=\"path\">{escape(directory)}</td><td>{stats['count']}</td>"
+                     f"<td>{stats['mean']:.2f}</td><td>{stats['std']:.2f}</td>"
+                     f"<td>{stats['min']:.2f}</td><td>{stats['max']:.2f}</td></tr>")
+    parts.append('</table></body></html>')
+    return '\n'.join(parts) + '\n'
+
+def write_report(report, path):
+    # HTML for .html/.htm paths, JSON otherwise, - writes JSON to stdout
+    summary = report.to_dict()
+    if path == '-':
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith(('.html', '.htm')):
+            f.write(render_html(summary))
+        else:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
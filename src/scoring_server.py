@@ -0,0 +1,189 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from extract_features import extract_features
+from rate_snippet import DEFAULT_MODEL, load_scoring_model, score_features
+from languages import language_for_path, lexer_tables
+from feature_index import FeatureIndex
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Number of most recent requests used for the latency percentiles
+LATENCY_WINDOW = 10000
+# Open documents kept for incremental rescoring, least recently used are dropped
+MAX_DOCUMENTS = 256
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.snippets = 0
+
+    def record(self, latency, num_snippets):
+        with self.lock:
+            self.latencies.append(latency)
+            self.requests += 1
+            self.snippets += num_snippets
+
+    def summary(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            requests, snippets = self.requests, self.snippets
+        summary = {'requests': requests, 'snippets': snippets}
+        if len(latencies):
+            summary['p50_ms'] = round(float(np.percentile(latencies, 50)) * 1000, 3)
+            summary['p99_ms'] = round(float(np.percentile(latencies, 99)) * 1000, 3)
+        return summary
+
+class DocumentStore:
+    """Feature indexes of the documents open in editors, keyed by document id."""
+
+    def __init__(self, max_documents=MAX_DOCUMENTS):
+        self.lock = threading.Lock()
+        self.documents = OrderedDict()
+        self.max_documents = max_documents
+
+    def open(self, document, index):
+        with self.lock:
+            self.documents[document] = index
+            self.documents.move_to_end(document)
+            while len(self.documents) > self.max_documents:
+                self.documents.popitem(last=False)
+
+    def get(self, document):
+        with self.lock:
+            index = self.documents.get(document)
+            if index is not None:
+                self.documents.move_to_end(document)
+            return index
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """Serves POST /score, POST /edit and GET /stats.
+
+    /score accepts {"code": "..."} for one snippet or
+    {"snippets": [{"name": "...", "code": "..."}, ...]} for a batch, and
+    answers with {"scores": [...]} in the same order. The language is taken
+    from an optional "language" field, or else from the name's extension.
+
+    /edit rescores a document open in an editor in time proportional to the
+    edit. {"document": "...", "code": "..."} opens it, then
+    {"document": "...", "start": 10, "end": 12, "text": "..."} replaces
+    lines [start, end) with the lines of text. Both answer with {"score": ...}.
+    """
+
+    def do_POST(self):
+        if self.path == '/score':
+            self.score()
+        elif self.path == '/edit':
+            self.edit()
+        else:
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length))
+
+    def score(self):
+        start = time.perf_counter()
+        try:
+            request = self.read_json()
+            snippets = request['snippets'] if 'snippets' in request else [request]
+            codes = [snippet['code'] for snippet in snippets]
+            if not all(isinstance(code, str) for code in codes):
+                raise TypeError("code must be a string")
+            snippet_languages = [snippet.get('language') or language_for_path(snippet.get('name', ''))
+                                 for snippet in snippets]
+            for language in set(snippet_languages):
+                lexer_tables(language)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'error': f"Invalid request: {e}"})
+            return
+        model = self.server.model
+        scores = score_features([extract_features(code, language, model.feature_names)
+                                 for code, language in zip(codes, snippet_languages)], model)
+        self.send_json(200, {'scores': [round(float(score), 4) for score in scores]})
+        self.server.stats.record(time.perf_counter() - start, len(codes))
+
+    def edit(self):
+        start = time.perf_counter()
+        model = self.server.model
+        try:
+            request = self.read_json()
+            document = request['document']
+            if not isinstance(request.get('code', request.get('text', '')), str):
+                raise TypeError("code and text must be strings")
+            if 'code' in request:
+                language = request.get('language') or language_for_path(document)
+                index = FeatureIndex(request['code'], language, model.feature_names)
+                self.server.documents.open(document, index)
+            else:
+                index = self.server.documents.get(document)
+                if index is None:
+                    self.send_json(404, {'error': f"Unknown document {document}, send its code first"})
+                    return
+                # Edits of one document are applied one at a time
+                with self.server.documents.lock:
+                    index.replace_text(int(request['start']), int(request['end']), request['text'])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'error': f"Invalid request: {e}"})
+            return
+        with self.server.documents.lock:
+            features = index.features()
+        score = score_features([features], model)[0]
+        self.send_json(200, {'score': round(float(score), 4), 'lines': len(index.lines)})
+        self.server.stats.record(time.perf_counter() - start, 1)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        self.send_json(200, self.server.stats.summary())
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the cost of small requests
+        pass
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, model=DEFAULT_MODEL):
+    server = ThreadingHTTPServer((host, port), ScoringHandler)
+    server.model = model
+    server.stats = LatencyStats()
+    server.documents = DocumentStore()
+    return server
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve readability scores over HTTP on localhost.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--model', metavar='PATH',
+                        help="Model artifact written by train_model.py (default: built-in survey model)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    model = load_scoring_model(args.model)
+    server = create_server(args.host, args.port, model)
+    print(f"Scoring server listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.summary()), file=sys.stderr)
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
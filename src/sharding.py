@@ -0,0 +1,28 @@
+import hashlib
+import argparse
+
+def parse_shard(text):
+    """argparse type for "i/N": the i-th of N shards, 1 <= i <= N."""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard {text!r}, expected i/N, e.g. 1/4")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard {text!r}, i must be between 1 and N")
+    return index, count
+
+def shard_of(path, count):
+    # Stable across machines and Python processes, unlike hash()
+    digest = hashlib.blake2b(path.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+def in_shard(path, shard):
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(path, count) == index
+
+def add_shard_argument(parser, what):
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help=f"Process only the i-th of N shards of the {what}, split by a stable hash of the path. "
+                             "Combine the outputs with merge_shards.py")
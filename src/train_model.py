@@ -1,115 +1,481 @@
 import os
 import re
 import sys
+import csv
+import math
+import time
+import random
+import argparse
+import tempfile
+import itertools
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from scipy.stats import pearsonr
-from sklearn.model_selection import LeaveOneOut
+from sklearn.model_selection import KFold, LeaveOneOut, RepeatedStratifiedKFold, StratifiedKFold
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from joblib import Parallel, delayed
+from crawler import add_crawl_arguments, crawl, crawl_options
+from model_artifact import Model, save_model
+from feature_writers import iter_feature_table, load_feature_table
+import instrumentation
 
-def extract_features_from_csv(snippet_filename, df):
-    row = df[df['snippet_filename'] == snippet_filename]
-    if row.empty:
+# Candidate features available in the extracted features file
+FEATURE_COLUMNS = [
+    'avg_line_length', 'max_line_length', 'avg_num_identifiers', 'max_num_identifiers',
+    'avg_identifier_len', 'max_identifier_len', 'avg_indentation', 'max_indentation',
+    'avg_keywords', 'avg_numbers', 'avg_comments', 'avg_comment_len', 'avg_strings',
+    'avg_strings_len', 'avg_commas_periods', 'avg_spaces', 'avg_parenthesis', 'avg_blank_lines',
+]
+
+# Features the model is trained on
+MODEL_FEATURE_COLUMNS = [
+    'avg_strings', 'avg_line_length', 'avg_commas_periods', 'avg_num_identifiers',
+    'avg_keywords', 'avg_strings_len', 'avg_comment_len', 'avg_identifier_len',
+]
+
+# Bins of the rating histogram used to find the median in out-of-core training
+MEDIAN_BINS = 1 << 16
+
+# Regularization strengths tried by --search unless --search-c is given
+DEFAULT_C_VALUES = [0.01, 0.1, 1.0, 10.0, 100.0]
+SEARCH_METRICS = ['f1', 'accuracy', 'precision', 'recall']
+
+def join_snippet_features(snippet_filenames, df):
+    # One indexed merge instead of scanning the whole table for every snippet.
+    # Only the first row of a duplicated snippet is used, as before.
+    features = df[['snippet_filename', *FEATURE_COLUMNS, 'readability_rating']].drop_duplicates('snippet_filename')
+    snippets = pd.DataFrame({'snippet_filename': snippet_filenames})
+    joined = snippets.merge(features, on='snippet_filename', how='left', indicator=True)
+    missing = joined['_merge'] == 'left_only'
+    for snippet_filename in joined.loc[missing, 'snippet_filename']:
         print(f"No data found for snippet {snippet_filename}")
-        return None
-
-    features = {
-        'avg_line_length': row['avg_line_length'].values[0],
-        'max_line_length': row['max_line_length'].values[0],
-        'avg_num_identifiers': row['avg_num_identifiers'].values[0],
-        'max_num_identifiers': row['max_num_identifiers'].values[0],
-        'avg_identifier_len': row['avg_identifier_len'].values[0],
-        'max_identifier_len': row['max_identifier_len'].values[0],
-        'avg_indentation': row['avg_indentation'].values[0],
-        'max_indentation': row['max_indentation'].values[0],
-        'avg_keywords': row['avg_keywords'].values[0],
-        'avg_numbers': row['avg_numbers'].values[0],
-        'avg_comments': row['avg_comments'].values[0],
-        'avg_comment_len': row['avg_comment_len'].values[0],
-        'avg_strings': row['avg_strings'].values[0],
-        'avg_strings_len': row['avg_strings_len'].values[0],
-        'avg_commas_periods': row['avg_commas_periods'].values[0],
-        'avg_spaces': row['avg_spaces'].values[0],
-        'avg_parenthesis': row['avg_parenthesis'].values[0],
-        'avg_blank_lines': row['avg_blank_lines'].values[0],
-    }
-    return features
+    return joined[~missing].drop(columns='_merge').reset_index(drop=True)
 
-def read_code_snippets(directory):
+def read_code_snippets(directory, options=None):
     snippets = []
     snippet_filenames = []
-    for filename in os.listdir(directory):
-        if filename.endswith('.go'):
-            filepath = os.path.join(directory, filename)
-            with open(filepath, 'r', encoding='utf-8') as file:
-                code = file.read()
-                snippets.append(code)
-                snippet_filenames.append(filename)
+    for filepath in crawl(directory, ('.go',), **(options or {})):
+        with open(filepath, 'r', encoding='utf-8') as file:
+            code = file.read()
+            snippets.append(code)
+            # Keyed like extract_features.py, relative to the snippet directory
+            snippet_filenames.append(os.path.relpath(filepath, directory))
     return snippets, snippet_filenames
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python readability_model.py <code_snippets_directory> <labels_csv_file>")
+# Per-fold timings are listed individually up to this many folds
+MAX_LISTED_FOLDS = 50
+# --warm-start first fits every WARM_START_STEP-th training row of a fold
+WARM_START_STEP = 10
+
+def make_cross_validator(strategy, folds, repeats, seed):
+    if strategy == 'loo':
+        return LeaveOneOut()
+    if strategy == 'kfold':
+        return KFold(n_splits=folds, shuffle=True, random_state=seed)
+    if strategy == 'stratified':
+        return StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    return RepeatedStratifiedKFold(n_splits=folds, n_repeats=repeats, random_state=seed)
+
+def normalize_fold(X_train, X_test):
+    # Statistics come from the training fold only, so nothing leaks from the test fold
+    mean = X_train.mean(axis=0)
+    std = X_train.std(axis=0, ddof=1)
+    std[std == 0] = 1
+    return (X_train - mean) / std, (X_test - mean) / std
+
+def evaluate_fold(X, y, train_index, test_index, warm_start=False):
+    start = time.perf_counter()
+    X_train, X_test = normalize_fold(X[train_index], X[test_index])
+    y_train = y[train_index]
+    model = LogisticRegression()
+    # Every WARM_START_STEP-th training row, test rows never reach the start
+    # point. Both classes are needed to fit it.
+    warm_rows = slice(None, None, WARM_START_STEP)
+    if warm_start and len(np.unique(y_train[warm_rows])) > 1:
+        model = LogisticRegression(warm_start=True).fit(X_train[warm_rows], y_train[warm_rows])
+    model.fit(X_train, y_train)
+    y_pred_prob = model.predict_proba(X_test)[:, 1]
+    y_pred_label = (y_pred_prob >= 0.5).astype(int)
+    return test_index, y_pred_label, time.perf_counter() - start
+
+def cross_validate(X, y, cross_validator, jobs=1, warm_start=False):
+    return Parallel(n_jobs=jobs)(
+        delayed(evaluate_fold)(X, y, train_index, test_index, warm_start)
+        for train_index, test_index in cross_validator.split(X, y))
+
+def report_fold_times(fold_results, wall_time):
+    fold_times = [fold_time for _, _, fold_time in fold_results]
+    if len(fold_results) <= MAX_LISTED_FOLDS:
+        print("\nFold timings:")
+        for i, (test_index, _, fold_time) in enumerate(fold_results):
+            print(f"Fold {i + 1}: {len(test_index)} test snippets, {fold_time * 1000:.1f} ms")
+    print(f"\n{len(fold_results)} folds in {wall_time:.2f}s wall-clock, "
+          f"{np.mean(fold_times) * 1000:.1f} ms mean, {np.max(fold_times) * 1000:.1f} ms max per fold")
+
+class OnlineFeatureStats:
+    """Mean and sample standard deviation of feature rows, merged chunk by chunk."""
+
+    def __init__(self, num_features):
+        self.count = 0
+        self.mean = np.zeros(num_features)
+        self.m2 = np.zeros(num_features)
+
+    def update(self, X):
+        # Chan et al. pairwise update, stable for any chunk sizes
+        n = len(X)
+        if not n:
+            return
+        chunk_mean = X.mean(axis=0)
+        chunk_m2 = ((X - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def std(self):
+        # ddof=1 like pandas, constant features are left unscaled
+        std = np.sqrt(self.m2 / max(self.count - 1, 1))
+        std[std == 0] = 1
+        return std
+
+def list_snippet_filenames(directory, options=None):
+    return [os.path.relpath(path, directory) for path in crawl(directory, ('.go',), **(options or {}))]
+
+def iter_training_chunks(labels_file, snippet_filenames, chunk_size, feature_columns):
+    # Yields (features, ratings, row numbers) of the snippets in the code
+    # directory, keeping the first row of a duplicated snippet like the
+    # in-memory join. Memory depends on the chunk size and the number of
+    # snippet files, not on the size of the table.
+    wanted = set(snippet_filenames)
+    seen = set()
+    row_number = 0
+    columns = ['snippet_filename', *feature_columns, 'readability_rating']
+    for chunk in iter_feature_table(labels_file, chunk_size, columns):
+        keep = []
+        for i, filename in enumerate(chunk['snippet_filename'].astype(str)):
+            if filename in wanted and filename not in seen:
+                seen.add(filename)
+                keep.append(i)
+        if not keep:
+            continue
+        chunk = chunk.iloc[keep]
+        yield (chunk[feature_columns].to_numpy(dtype=float), chunk['readability_rating'].to_numpy(dtype=float),
+               np.arange(row_number, row_number + len(keep)))
+        row_number += len(keep)
+
+def median_from_histogram(chunks, low, high, count):
+    # Upper edge of the histogram bin holding the lower middle rating. Any
+    # threshold between the two middle ratings gives the same labels, the
+    # bins only blur ratings closer together than (high - low) / MEDIAN_BINS.
+    histogram = np.zeros(MEDIAN_BINS, dtype=np.int64)
+    for _, ratings, _ in chunks:
+        histogram += np.histogram(ratings, bins=MEDIAN_BINS, range=(low, high))[0]
+    median_bin = int(np.searchsorted(np.cumsum(histogram), (count + 1) // 2))
+    return low + (high - low) * (median_bin + 1) / MEDIAN_BINS if high > low else low
+
+def train_out_of_core(args, snippet_filenames):
+    """Trains by streaming the features table in chunks of args.chunk_size rows.
+
+    The table is read several times: once for the normalization statistics,
+    once for the median rating, once per epoch of SGD and once to evaluate
+    the held-out rows (every --folds-th row). Feature rows are only held one
+    chunk at a time, but the snippet filenames and the set of snippets seen
+    are kept in memory, so memory grows with the number of snippets.
+    """
+    metrics = instrumentation.metrics
+    feature_columns = MODEL_FEATURE_COLUMNS
+
+    def chunks():
+        return iter_training_chunks(args.labels_file, snippet_filenames, args.chunk_size, feature_columns)
+
+    with metrics.stage('feature_stats'):
+        stats = OnlineFeatureStats(len(feature_columns))
+        low, high = np.inf, -np.inf
+        for X, ratings, _ in chunks():
+            stats.update(X)
+            low, high = min(low, ratings.min()), max(high, ratings.max())
+    metrics.count('snippets', stats.count)
+    if not stats.count:
+        print("No data available after processing. Exiting.")
         sys.exit(1)
+    mean, std = stats.mean, stats.std()
+
+    with metrics.stage('median_rating'):
+        median_rating = median_from_histogram(chunks(), low, high, stats.count)
+
+    model = SGDClassifier(loss='log_loss', random_state=args.seed)
+    for epoch in range(args.epochs):
+        with metrics.stage('partial_fit'):
+            for X, ratings, rows in chunks():
+                train_rows = rows % args.folds != 0
+                if train_rows.any():
+                    model.partial_fit((X[train_rows] - mean) / std, (ratings[train_rows] > median_rating).astype(int),
+                                      classes=[0, 1])
+
+    # Confusion matrix of the held-out rows, accumulated chunk by chunk
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    with metrics.stage('evaluate'):
+        for X, ratings, rows in chunks():
+            test_rows = rows % args.folds == 0
+            if test_rows.any():
+                y_true = (ratings[test_rows] > median_rating).astype(int)
+                y_pred = model.predict((X[test_rows] - mean) / std)
+                confusion += confusion_matrix(y_true, y_pred, labels=[0, 1])
+
+    (tn, fp), (fn, tp) = confusion
+    total = confusion.sum()
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(f"Trained on {stats.count - total} snippets in {args.epochs} epochs, "
+          f"evaluated on {total} held-out snippets (ratings above {median_rating:.2f} are labeled readable)")
+    print("Model performance:")
+    print(f"Accuracy: {(tp + tn) / total if total else 0.0:.2f}")
+    print(f"Precision: {precision:.2f}")
+    print(f"Recall: {recall:.2f}")
+    print(f"F-score: {2 * precision * recall / (precision + recall) if precision + recall else 0.0:.2f}")
+    print("\nConfusion matrix:")
+    print(confusion)
+
+    if args.output_model:
+        save_model(args.output_model, Model(
+            feature_names=feature_columns,
+            mean=mean,
+            std=std,
+            coefficients=model.coef_[0],
+            intercept=model.intercept_[0],
+        ))
+        print(f"\nModel saved to {args.output_model}")
+
+def candidate_subsets(num_candidates, min_features, max_features, max_subsets, seed):
+    # All subsets of the allowed sizes, or a seeded random sample of them when
+    # there are more than max_subsets
+    sizes = range(max(min_features, 1), min(max_features, num_candidates) + 1)
+    counts = [math.comb(num_candidates, size) for size in sizes]
+    if sum(counts) <= max_subsets:
+        return [subset for size in sizes for subset in itertools.combinations(range(num_candidates), size)]
+    rng = random.Random(seed)
+    subsets = set()
+    while len(subsets) < max_subsets:
+        size = rng.choices(sizes, weights=counts)[0]
+        subsets.add(tuple(sorted(rng.sample(range(num_candidates), size))))
+    return sorted(subsets, key=lambda subset: (len(subset), subset))
+
+# Arrays opened by this worker process, keyed by path
+_shared_arrays = {}
+
+def load_shared_array(path):
+    # Memory-mapped read-only, so all workers share the page cache instead of
+    # receiving their own copy
+    array = _shared_arrays.get(path)
+    if array is None:
+        array = _shared_arrays[path] = np.load(path, mmap_mode='r')
+    return array
+
+def evaluate_configuration(shared_dir, cross_validator, columns, C):
+    start = time.perf_counter()
+    X = load_shared_array(os.path.join(shared_dir, 'features.npy'))[:, list(columns)]
+    y = load_shared_array(os.path.join(shared_dir, 'labels.npy'))
+    # Confusion counts over all folds, cheaper than the sklearn.metrics calls
+    tp = fp = fn = tn = 0
+    for train_index, test_index in cross_validator.split(X, y):
+        model = LogisticRegression(C=C).fit(X[train_index], y[train_index])
+        y_true = y[test_index] == 1
+        y_pred = model.predict(X[test_index]) == 1
+        tp += int(np.sum(y_true & y_pred))
+        fp += int(np.sum(~y_true & y_pred))
+        fn += int(np.sum(y_true & ~y_pred))
+        tn += int(np.sum(~y_true & ~y_pred))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'accuracy': (tp + tn) / (tp + fp + fn + tn),
+        'precision': precision,
+        'recall': recall,
+        'C': C,
+        'num_features': len(columns),
+        'columns': columns,
+        'seconds': time.perf_counter() - start,
+    }
+
+def search_models(args, df_data):
+    """Cross-validates LogisticRegression over feature subsets and C values in parallel.
+
+    The normalized feature matrix is computed once, saved as .npy and
+    memory-mapped by every worker. Statistics come from all snippets, unlike
+    the per-fold normalization of a single evaluation, so the winning
+    configuration should be confirmed with a normal training run.
+    """
+    metrics = instrumentation.metrics
+    candidates = [name for name in FEATURE_COLUMNS if df_data[name].notna().all()]
+    skipped = [name for name in FEATURE_COLUMNS if name not in candidates]
+    if skipped:
+        print(f"Skipping features with missing values (extract with --all-features): {', '.join(skipped)}")
+    if not candidates:
+        print("No complete feature columns to search. Exiting.")
+        sys.exit(1)
+
+    X = df_data[candidates].to_numpy(dtype=float)
+    std = X.std(axis=0, ddof=1)
+    std[std == 0] = 1
+    X_normalized = (X - X.mean(axis=0)) / std
+    y = df_data['readability_label'].to_numpy()
+
+    subsets = candidate_subsets(len(candidates), args.min_features, args.max_features, args.max_subsets, args.seed)
+    # Subsets are sorted tuples of column indices
+    model_subset = tuple(sorted(candidates.index(name) for name in MODEL_FEATURE_COLUMNS if name in candidates))
+    if len(model_subset) == len(MODEL_FEATURE_COLUMNS) and model_subset not in set(subsets):
+        # Always compare against the current model features
+        subsets.append(model_subset)
+    c_values = args.search_c or DEFAULT_C_VALUES
+    configurations = [(subset, C) for subset in subsets for C in c_values]
+    cross_validator = make_cross_validator(args.cv, args.folds, args.repeats, args.seed)
+    print(f"Searching {len(subsets)} feature subsets x {len(c_values)} C values = "
+          f"{len(configurations)} configurations on {len(y)} snippets")
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as shared_dir, metrics.stage('search'):
+        np.save(os.path.join(shared_dir, 'features.npy'), X_normalized)
+        np.save(os.path.join(shared_dir, 'labels.npy'), y)
+        results = Parallel(n_jobs=args.jobs)(
+            delayed(evaluate_configuration)(shared_dir, cross_validator, subset, C)
+            for subset, C in configurations)
+    wall_time = time.perf_counter() - start
+    metrics.count('configurations', len(results))
+
+    # Best metric first, fewer features and stronger regularization break ties
+    results.sort(key=lambda result: (-result[args.search_metric], result['num_features'], result['C']))
+    print(f"\nLeaderboard by {args.search_metric} ({len(results)} configurations in {wall_time:.2f}s wall-clock):")
+    print(f"{'rank':>4} {'f1':>5} {'acc':>5} {'prec':>5} {'rec':>5} {'C':>8} {'ms':>8}  features")
+    for rank, result in enumerate(results[:args.leaderboard], 1):
+        features = ', '.join(candidates[i] for i in result['columns'])
+        print(f"{rank:>4} {result['f1']:>5.2f} {result['accuracy']:>5.2f} {result['precision']:>5.2f} "
+              f"{result['recall']:>5.2f} {result['C']:>8g} {result['seconds'] * 1000:>8.1f}  {features}")
+
+    if args.leaderboard_output:
+        with open(args.leaderboard_output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'f1', 'accuracy', 'precision', 'recall', 'C', 'num_features', 'seconds',
+                             'features'])
+            for rank, result in enumerate(results, 1):
+                writer.writerow([rank, f"{result['f1']:.4f}", f"{result['accuracy']:.4f}",
+                                 f"{result['precision']:.4f}", f"{result['recall']:.4f}", result['C'],
+                                 result['num_features'], f"{result['seconds']:.6f}",
+                                 ' '.join(candidates[i] for i in result['columns'])])
+        print(f"\nLeaderboard saved to {args.leaderboard_output}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate the readability model.")
+    parser.add_argument('code_dir', help="Directory with Go code snippets, searched recursively")
+    parser.add_argument('labels_file',
+                        help="Extracted features with readability ratings (.csv, .npy or .parquet)")
+    parser.add_argument('--output-model', metavar='PATH',
+                        help="Fit the model on all snippets and save it as a .npz artifact for rate_snippet.py")
+    parser.add_argument('--cv', choices=['loo', 'kfold', 'stratified', 'repeated'], default='loo',
+                        help="Cross-validation strategy: leave-one-out, k-fold, stratified k-fold "
+                             "or repeated stratified k-fold (default: loo)")
+    parser.add_argument('--folds', type=int, default=5, help="Number of folds for k-fold strategies (default: 5)")
+    parser.add_argument('--repeats', type=int, default=10, help="Number of repeats for --cv repeated (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed used to shuffle folds (default: 0)")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of folds evaluated in parallel, -1 uses all cores (default: 1)")
+    parser.add_argument('--warm-start', action='store_true',
+                        help="Start every fold from a fit on every 10th row of its own training data")
+    parser.add_argument('--chunk-size', type=int, metavar='ROWS',
+                        help="Stream the features table in chunks of ROWS rows and train incrementally with SGD "
+                             "instead of loading it into memory, every --folds-th snippet is held out for evaluation")
+    parser.add_argument('--epochs', type=int, default=5,
+                        help="Passes over the data with --chunk-size (default: 5)")
+    parser.add_argument('--search', action='store_true',
+                        help="Cross-validate feature subsets and regularization strengths in parallel (--jobs) "
+                             "and print a leaderboard instead of training one model")
+    parser.add_argument('--min-features', type=int, default=1, help="Smallest feature subset searched (default: 1)")
+    parser.add_argument('--max-features', type=int, default=len(FEATURE_COLUMNS),
+                        help=f"Largest feature subset searched (default: {len(FEATURE_COLUMNS)})")
+    parser.add_argument('--max-subsets', type=int, default=500,
+                        help="Randomly sample this many subsets when there are more (default: 500)")
+    parser.add_argument('--search-c', type=float, nargs='+', metavar='C',
+                        help=f"Regularization strengths searched (default: {' '.join(map(str, DEFAULT_C_VALUES))})")
+    parser.add_argument('--search-metric', choices=SEARCH_METRICS, default='f1',
+                        help="Metric the leaderboard is ranked by (default: f1)")
+    parser.add_argument('--leaderboard', type=int, default=20,
+                        help="Number of leaderboard rows printed (default: 20)")
+    parser.add_argument('--leaderboard-output', metavar='PATH', help="Write the whole leaderboard as CSV to PATH")
+    add_crawl_arguments(parser)
+    instrumentation.add_profiling_arguments(parser)
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    profiler = instrumentation.start_profiling(args)
+    try:
+        train(args)
+    finally:
+        instrumentation.finish_profiling(args, profiler)
+
+def train(args):
+    metrics = instrumentation.metrics
+    code_dir = args.code_dir
+    labels_file = args.labels_file
+
+    if args.chunk_size:
+        with metrics.stage('read_snippets'):
+            snippet_filenames = list_snippet_filenames(code_dir, crawl_options(args))
+        if not snippet_filenames:
+            print("No valid Go code snippets found in the specified directory.")
+            sys.exit(1)
+        train_out_of_core(args, snippet_filenames)
+        return
     
-    code_dir = sys.argv[1]
-    labels_file = sys.argv[2]
-    
-    snippets, snippet_filenames = read_code_snippets(code_dir)
+    with metrics.stage('read_snippets'):
+        snippets, snippet_filenames = read_code_snippets(code_dir, crawl_options(args))
     if not snippets:
         print("No valid Go code snippets found in the specified directory.")
         sys.exit(1)
     
-    df = pd.read_csv(labels_file)
-    
-    data = []
-    for code, snippet_filename in zip(snippets, snippet_filenames):
-        features = extract_features_from_csv(snippet_filename, df)
-        if features is None:
-            continue
-
-        label_row = df[df['snippet_filename'] == snippet_filename]
-        if label_row.empty:
-            print(f"No label found for snippet {snippet_filename}.")
-            continue
-        readability_rating = label_row['readability_rating'].values[0]
-        
-        data.append({'snippet_filename': snippet_filename, **features, 'readability_rating': readability_rating})
+    with metrics.stage('load_features'):
+        df = load_feature_table(labels_file)
     
-    if not data:
+    with metrics.stage('join'):
+        df_data = join_snippet_features(snippet_filenames, df)
+    metrics.count('snippets', len(df_data))
+    if df_data.empty:
         print("No data available after processing. Exiting.")
         sys.exit(1)
     
-    df_data = pd.DataFrame(data)
-    
     # Split readability labels into two classes 0/1 based on median
     median_rating = df_data['readability_rating'].median()
     df_data['readability_label'] = df_data['readability_rating'].apply(lambda x: 1 if x > median_rating else 0)
     
-    feature_columns = ['avg_strings', 'avg_line_length', 'avg_commas_periods',
-                       'avg_num_identifiers', 'avg_keywords', 'avg_strings_len', 'avg_comment_len', 'avg_identifier_len']
+    if args.search:
+        search_models(args, df_data)
+        return
+
+    feature_columns = MODEL_FEATURE_COLUMNS
     
     X = df_data[feature_columns]
     X_normalized = (X - X.mean()) / X.std()
     y = df_data['readability_label']
     
     model = LogisticRegression()
-    leave_one_out = LeaveOneOut()
+
+    cross_validator = make_cross_validator(args.cv, args.folds, args.repeats, args.seed)
+    start = time.perf_counter()
+    with metrics.stage('cross_validate'):
+        fold_results = cross_validate(X.to_numpy(dtype=float), y.to_numpy(), cross_validator, args.jobs, args.warm_start)
+    wall_time = time.perf_counter() - start
+    metrics.count('folds', len(fold_results))
+
     y_true = []
     y_pred = []
-    
-    for train_index, test_index in leave_one_out.split(X_normalized):
-        X_train, X_test = X_normalized.iloc[train_index], X_normalized.iloc[test_index]
-        y_train, y_test = y.iloc[train_index], y.iloc[test_index]
-        
-        model.fit(X_train, y_train)
-        y_pred_prob = model.predict_proba(X_test)[:, 1]
-        y_pred_label = (y_pred_prob >= 0.5).astype(int)
-        
-        y_true.extend(y_test)
+    # Predicted label per snippet, only meaningful when each snippet is tested once
+    snippet_pred = np.full(len(y), -1)
+    for test_index, y_pred_label, _ in fold_results:
+        y_true.extend(y.iloc[test_index])
         y_pred.extend(y_pred_label)
-    
+        snippet_pred[test_index] = y_pred_label
 
     print("Model performance:")
     print(f"Accuracy: {accuracy_score(y_true, y_pred):.2f}")
@@ -119,13 +485,29 @@ def main():
     
     print("\nConfusion matrix:")
     print(confusion_matrix(y_true, y_pred))
+
+    report_fold_times(fold_results, wall_time)
     
-    df_data = df_data.sort_values(by='snippet_filename')
-    df_data['predicted_readability_label'] = y_pred
-    
-    output_columns = ['snippet_filename', 'readability_label', 'predicted_readability_label'] + feature_columns
-    print("\nPredicted readability scores:")
-    print(df_data[output_columns])
+    if args.cv != 'repeated':
+        df_data['predicted_readability_label'] = snippet_pred
+        df_data = df_data.sort_values(by='snippet_filename')
+
+        output_columns = ['snippet_filename', 'readability_label', 'predicted_readability_label'] + feature_columns
+        print("\nPredicted readability scores:")
+        print(df_data[output_columns])
+
+    if args.output_model:
+        # Refit on all snippets, the fitted parameters are what rate_snippet.py scores with
+        with metrics.stage('fit_final'):
+            model.fit(X_normalized, y)
+        save_model(args.output_model, Model(
+            feature_names=feature_columns,
+            mean=X.mean().to_numpy(),
+            std=X.std().to_numpy(),
+            coefficients=model.coef_[0],
+            intercept=model.intercept_[0],
+        ))
+        print(f"\nModel saved to {args.output_model}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()